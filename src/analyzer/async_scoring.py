@@ -0,0 +1,266 @@
+import os
+import math
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
+
+from analyzer.code_quality_analyzer import (
+    MODEL, TEMPERATURE, SCORE_PROMPT_VERSION, SUMMARY_PROMPT_VERSION,
+    CHUNK_SUMMARY_PROMPT_VERSION, REDUCE_SUMMARY_PROMPT_VERSION,
+    SCORE_RUBRIC, SUMMARY_INSTRUCTIONS, CHUNK_SUMMARY_INSTRUCTIONS, REDUCE_SUMMARY_INSTRUCTIONS,
+    extract_score, message_params, record_usage, score_prompt, summary_prompt, chunk_summary_prompt, reduce_summary_prompt,
+)
+from analyzer.score_cache import get_score_cache
+from tracing import traced
+from analyzer.token_budget import (
+    estimate_tokens, fit_to_budget, chunk_source, cap_chunks,
+    FILE_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET, CHUNK_TOKENS, REPO_TOKEN_CAP,
+)
+
+# Seconds after a decrease in which 429s without an issue time count as the same event
+DECREASE_COOLDOWN = 1.0
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter shared by every request in a run.
+
+    Each success raises the limit by 1/limit (about +1 per round of
+    requests); a rate-limit response halves it and pauses all callers until
+    the provider's retry-after has passed. The limit therefore settles just
+    under the provider quota instead of a fixed worker count.
+
+    Once the provider starts refusing, every request in flight gets a 429;
+    only the first halves the limit. Later ones from requests issued before
+    that decrease (or, without an issue time, within DECREASE_COOLDOWN
+    seconds of it) belong to the same congestion event and are ignored.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.completed = 0
+        self.rate_limited = 0
+        # Token usage (incl. prompt-cache reads/writes) of admitted requests
+        self.usage = {}
+        self.started = time.monotonic()
+        self._resume_at = 0.0
+        self._last_decrease = -math.inf
+        self._loop = None
+
+    @property
+    def _cond(self):
+        # One limiter may outlive several asyncio.run() calls; the learned
+        # limit carries over but the condition must belong to the running loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def __aenter__(self):
+        async with self._cond:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause > 0:
+                    # Waiting on the condition releases it for finishing requests
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    break
+                await self._cond.wait()
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self.completed += 1
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_rate_limit(self, retry_after: Optional[float] = None, issued_at: Optional[float] = None):
+        """issued_at: time.monotonic() when the refused request was admitted."""
+        now = time.monotonic()
+        self.rate_limited += 1
+        if issued_at is not None:
+            same_event = issued_at < self._last_decrease
+        else:
+            same_event = now - self._last_decrease < DECREASE_COOLDOWN
+        if not same_event:
+            self.limit = max(self.minimum, self.limit / 2)
+            self._last_decrease = now
+        if retry_after:
+            self._resume_at = max(self._resume_at, now + retry_after)
+
+    def stats(self) -> Dict[str, float]:
+        minutes = (time.monotonic() - self.started) / 60
+        return {
+            'completed': self.completed,
+            'rate_limited': self.rate_limited,
+            'limit': round(self.limit, 2),
+            'per_minute': round(self.completed / minutes, 2) if minutes else 0.0,
+            'usage': dict(self.usage),
+        }
+
+def _retry_after(error) -> Optional[float]:
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+async def _create(client, limiter, params, max_retries=5):
+    from anthropic import RateLimitError
+    for attempt in range(max_retries):
+        try:
+            async with limiter:
+                issued_at = time.monotonic()
+                response = await client.messages.create(**params)
+            limiter.on_success()
+            record_usage(limiter.usage, response)
+            return response
+        except RateLimitError as e:
+            retry_after = _retry_after(e)
+            limiter.on_rate_limit(retry_after, issued_at)
+            if attempt == max_retries - 1:
+                raise
+            if not retry_after:
+                await asyncio.sleep(2 ** attempt)
+    return None
+
+@traced('llm.analyze_file')
+async def analyze_file_async(client, limiter, file_path, content):
+    content = fit_to_budget(content, FILE_TOKEN_BUDGET)
+    cache = get_score_cache()
+    if cache:
+        # SQLite calls and file reads go to a worker thread, off the event loop
+        cached = await asyncio.to_thread(cache.get, 'score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE)
+        if cached is not None:
+            return {"score": cached, "analyzed": True}
+    try:
+        response = await _create(client, limiter, message_params(SCORE_RUBRIC, score_prompt(content), 100))
+        score = extract_score(response.content[0].text)
+        if score is not None:
+            if cache:
+                await asyncio.to_thread(cache.put, 'score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE, score)
+            return {"score": score, "analyzed": True}
+        print(f"Failed to extract score for {file_path}")
+    except Exception as e:
+        print(f"Error analyzing file {file_path}: {str(e)}")
+    return {"score": None, "analyzed": False}
+
+@traced('llm.summarize')
+async def summarize_async(client, limiter, content, system, prompt_fn, version, max_tokens, kind):
+    cache = get_score_cache()
+    if cache:
+        cached = await asyncio.to_thread(cache.get, kind, content, version, MODEL, TEMPERATURE)
+        if cached is not None:
+            return cached
+    try:
+        response = await _create(client, limiter, message_params(system, prompt_fn(content), max_tokens))
+        summary = response.content[0].text.strip()
+        if cache:
+            await asyncio.to_thread(cache.put, kind, content, version, MODEL, TEMPERATURE, summary)
+        return summary
+    except Exception as e:
+        print(f"Error generating summary: {str(e)}")
+        return None
+
+@traced('llm.generate_summary')
+async def generate_summary_async(client, limiter, content):
+    # Same single-call / map-reduce split as generate_summary
+    if estimate_tokens(content) <= SUMMARY_TOKEN_BUDGET:
+        summary = await summarize_async(client, limiter, content, SUMMARY_INSTRUCTIONS, summary_prompt, SUMMARY_PROMPT_VERSION, 600, 'summary')
+        return summary or "Failed to generate summary."
+
+    chunks = cap_chunks(chunk_source(content, CHUNK_TOKENS), REPO_TOKEN_CAP)
+    partials = await asyncio.gather(*(
+        summarize_async(client, limiter, chunk, CHUNK_SUMMARY_INSTRUCTIONS, chunk_summary_prompt, CHUNK_SUMMARY_PROMPT_VERSION, 300, 'chunk_summary')
+        for chunk in chunks
+    ))
+    partials = [p for p in partials if p]
+    if not partials:
+        return "Failed to generate summary."
+    combined = "\n\n".join(f"Part {i + 1}:\n{p}" for i, p in enumerate(partials))
+    summary = await summarize_async(client, limiter, combined, REDUCE_SUMMARY_INSTRUCTIONS, reduce_summary_prompt, REDUCE_SUMMARY_PROMPT_VERSION, 600, 'reduce_summary')
+    return summary or "Failed to generate summary."
+
+def _read(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+        return file.read()
+
+@traced('llm.code_quality_analyze', sample=True)
+async def code_quality_analyze_async(client, limiter, repo_path, important_files, dedup_index=None):
+    """
+    Async counterpart of code_quality_analyze: all of a repo's files and its
+    summary are requested concurrently through the shared limiter. Returns
+    the same (avg_score, analysis_rate, summary) triple.
+    """
+    if len(important_files) == 0:
+        return 0, 0, 'nothing to analyze, skipping'
+
+    scores = []
+    pending = []
+    all_content = ''
+    for file_info in important_files:
+        file_path = os.path.join(repo_path, file_info['file'])
+        if not os.path.exists(file_path):
+            print(f"File not found: {file_path}")
+            continue
+        content = await asyncio.to_thread(_read, file_path)
+        all_content += content
+
+        signature = None
+        if dedup_index is not None:
+            signature = dedup_index.signature(content)
+            match = dedup_index.find_scored(signature, exclude=file_path)
+            if match:
+                dedup_index.insert(file_path, signature)
+                if dedup_index.reuse_scores:
+                    scores.append(match[1])
+                continue
+        pending.append((file_path, content, signature))
+
+    results = await asyncio.gather(
+        generate_summary_async(client, limiter, all_content),
+        *(analyze_file_async(client, limiter, path, content) for path, content, _ in pending)
+    )
+    summary, file_results = results[0], results[1:]
+
+    for (file_path, _, signature), result in zip(pending, file_results):
+        if result["analyzed"]:
+            scores.append(result['score'])
+            if dedup_index is not None:
+                dedup_index.insert(file_path, signature, result['score'])
+
+    if scores:
+        return sum(scores) / len(scores), (len(scores) / len(important_files)) * 100, summary
+    return 0, 0, summary
+
+async def score_repos_async(repos: Dict[str, Tuple[str, List[Dict[str, Any]]]], dedup_index=None,
+                            limiter: Optional[AdaptiveLimiter] = None) -> Dict[str, Any]:
+    # The SDK is imported on first use, like get_client, so importing this module stays cheap
+    import anthropic
+    client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+    limiter = limiter or AdaptiveLimiter()
+    keys = list(repos)
+    outcomes = await asyncio.gather(
+        *(code_quality_analyze_async(client, limiter, *repos[key][:2], dedup_index) for key in keys),
+        return_exceptions=True
+    )
+    print(f"Scoring throughput: {limiter.stats()}")
+    return dict(zip(keys, outcomes))
+
+def score_repos(repos, dedup_index=None, limiter=None):
+    """
+    Scores many repos concurrently. `repos` maps a key (e.g. repo URL) to
+    (repo_path, important_files); the result maps the same key to the
+    (avg_score, analysis_rate, summary) triple or the exception raised.
+    """
+    return asyncio.run(score_repos_async(repos, dedup_index, limiter))
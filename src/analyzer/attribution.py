@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import GITHUB_API_URL
+from tracing import traced
+
+SOURCES = ('blame', 'commits')
+# Files the candidate wrote less of than this are not sent to the LLM
+MIN_AUTHOR_SHARE = 0.5
+# Files blamed per GraphQL request, as aliased blame fields of one commit
+BLAME_BATCH = 20
+# Commits read per repo by the 'commits' source
+MAX_COMMITS = 100
+DEFAULT_CACHE_PATH = os.getenv('ATTRIBUTION_CACHE_PATH', 'attribution_cache.sqlite')
+
+# {path: {author login: lines (blame) or changed lines (commits)}}
+Authorship = Dict[str, Dict[str, int]]
+
+def authorship_from_commits(commits: Iterable[Dict[str, Any]]) -> Authorship:
+    """Changed lines per file and author, from RepoAnalyzer.get_commit_history(..., with_files=True)."""
+    authorship = defaultdict(lambda: defaultdict(int))
+    for commit in commits:
+        for file in commit.get('files', ()):
+            authorship[file['filename']][commit['author']] += file['changes'] or 1
+    return {path: dict(authors) for path, authors in authorship.items()}
+
+def _blame_query(owner: str, name: str, ref: str, paths: List[str]) -> str:
+    fields = ' '.join(
+        f'f{i}: blame(path: {json.dumps(path)}) {{ ranges {{ startingLine endingLine commit {{ author {{ user {{ login }} }} }} }} }}'
+        for i, path in enumerate(paths)
+    )
+    return (
+        f'query {{ repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ '
+        f'object(expression: {json.dumps(ref)}) {{ ... on Commit {{ {fields} }} }} }} }}'
+    )
+
+def blame_authorship(full_name: str, ref: str, paths: List[str], stats: Optional[Dict[str, Any]] = None) -> Authorship:
+    """
+    Blamed lines per file and author via the GraphQL API, BLAME_BATCH files
+    per request. Lines whose commit author has no GitHub account are
+    counted under 'Unknown'; paths GitHub has no blame for (missing at ref,
+    binary, empty) map to {} so they are cached rather than asked again.
+    """
+    import requests
+
+    owner, name = full_name.split('/', 1)
+    headers = {'Authorization': f"bearer {os.getenv('GITHUB_TOKEN')}"}
+    authorship = {}
+    for start in range(0, len(paths), BLAME_BATCH):
+        batch = paths[start:start + BLAME_BATCH]
+        response = requests.post(
+            f"{GITHUB_API_URL}/graphql", json={'query': _blame_query(owner, name, ref, batch)},
+            headers=headers, timeout=60
+        )
+        if stats is not None:
+            stats['requests'] += 1
+        response.raise_for_status()
+        commit = ((response.json().get('data') or {}).get('repository') or {}).get('object') or {}
+        for i, path in enumerate(batch):
+            blame = commit.get(f'f{i}')
+            if not blame:
+                authorship[path] = {}
+                continue
+            authors = defaultdict(int)
+            for span in blame['ranges']:
+                user = ((span.get('commit') or {}).get('author') or {}).get('user') or {}
+                authors[user.get('login') or 'Unknown'] += span['endingLine'] - span['startingLine'] + 1
+            authorship[path] = dict(authors)
+    return authorship
+
+def author_share(authors: Dict[str, int], login: str) -> float:
+    total = sum(authors.values())
+    login = login.lower()
+    return sum(count for author, count in authors.items() if author.lower() == login) / total if total else 0.0
+
+class AuthorshipCache:
+    """Authorship per (repo, revision, source) in SQLite, shared by every candidate of a repo."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS authorship (
+                repo TEXT NOT NULL,
+                revision TEXT NOT NULL,
+                source TEXT NOT NULL,
+                files TEXT NOT NULL,
+                PRIMARY KEY (repo, revision, source)
+            )
+        ''')
+        self._conn.commit()
+
+    def get(self, repo: str, revision: str, source: str) -> Optional[Authorship]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT files FROM authorship WHERE repo = ? AND revision = ? AND source = ?', (repo, revision, source)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, repo: str, revision: str, source: str, authorship: Authorship):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO authorship VALUES (?, ?, ?, ?)', (repo, revision, source, json.dumps(authorship))
+            )
+
+@lru_cache(maxsize=None)
+def get_authorship_cache() -> Optional[AuthorshipCache]:
+    """Process-wide cache; set ATTRIBUTION_CACHE_PATH to an empty string to disable."""
+    return AuthorshipCache(DEFAULT_CACHE_PATH) if DEFAULT_CACHE_PATH else None
+
+class FileAttributor:
+    """
+    Keeps the files a candidate wrote out of everything a repo ranks as
+    important. Authorship comes from blame ('blame', one GraphQL request
+    per BLAME_BATCH files) or from recent commits ('commits'), and is cached
+    per repo revision. Files without data inherit the candidate's share of
+    the whole repo; a repo without any data is passed through unfiltered.
+    Blame needs a valid GITHUB_TOKEN: without one, a warning is printed once,
+    blame is skipped for the rest of the run and stats() reports it.
+    """
+
+    def __init__(self, source: str = 'blame', min_share: float = MIN_AUTHOR_SHARE,
+                 cache: Optional[AuthorshipCache] = None):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown attribution source {source!r}, expected one of {SOURCES}")
+        self.source = source
+        self.min_share = min_share
+        self.cache = cache
+        self._stats = {'repos': 0, 'requests': 0, 'commits': 0, 'cache_hits': 0, 'seconds': 0.0,
+                       'files_kept': 0, 'files_dropped': 0, 'repos_without_data': 0, 'auth_failures': 0}
+        # Why blame can't authenticate, once it is known; None while it can
+        self._auth_error = None
+        self._lock = threading.Lock()
+
+    def _auth_failed(self, reason: Optional[str] = None):
+        with self._lock:
+            self._stats['auth_failures'] += 1
+            first = self._auth_error is None
+            if first:
+                self._auth_error = reason
+        if first:
+            print(f"Warning: blame attribution disabled, {reason}; repos fall back to unfiltered file selection")
+
+    @traced('attribution.authorship', sample=True)
+    def authorship(self, full_name: str, revision: str, paths: List[str], ref: str = 'HEAD',
+                   load_commits: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None) -> Authorship:
+        """Authorship of `paths` (relative to the repo root); load_commits feeds the 'commits' source."""
+        started = time.perf_counter()
+        stats = {'requests': 0, 'commits': 0}
+        cached = self.cache.get(full_name, revision, self.source) if self.cache else None
+        authorship = dict(cached or {})
+        try:
+            if self.source == 'blame':
+                missing = [path for path in paths if path not in authorship]
+                if missing and not os.getenv('GITHUB_TOKEN'):
+                    self._auth_failed("GITHUB_TOKEN is not set")
+                elif missing and self._auth_error:
+                    self._auth_failed()
+                elif missing:
+                    authorship.update(blame_authorship(full_name, ref, missing, stats))
+            elif cached is None:
+                commits = list(load_commits()) if load_commits else []
+                stats['commits'] = len(commits)
+                authorship = authorship_from_commits(commits)
+        except Exception as e:
+            if getattr(getattr(e, 'response', None), 'status_code', None) == 401:
+                self._auth_failed(f"GitHub rejected GITHUB_TOKEN ({e})")
+            else:
+                print(f"Attribution failed for {full_name}: {e}")
+        fetched = authorship != (cached or {})
+        if self.cache and fetched:
+            self.cache.put(full_name, revision, self.source, authorship)
+        with self._lock:
+            self._stats['repos'] += 1
+            self._stats['requests'] += stats['requests']
+            self._stats['commits'] += stats['commits']
+            self._stats['cache_hits'] += cached is not None and not fetched
+            self._stats['seconds'] += time.perf_counter() - started
+        return authorship
+
+    def select(self, ranked: List[Tuple[str, float]], paths: List[str], authorship: Authorship,
+               login: str, limit: Optional[int] = None) -> List[Tuple[str, float, Optional[float]]]:
+        """
+        From (file_path, importance) pairs and their repo-relative `paths`,
+        the top `limit` files whose candidate share reaches min_share, as
+        (file_path, importance weighted by share, share).
+        """
+        # Empty entries are files blame had nothing for; they count as no data
+        known = [authorship[path] for path in paths if authorship.get(path)]
+        if not known:
+            with self._lock:
+                self._stats['repos_without_data'] += 1
+                self._stats['files_kept'] += len(ranked[:limit])
+            return [(file_path, importance, None) for file_path, importance in ranked[:limit]]
+
+        totals = defaultdict(int)
+        for authors in authorship.values():
+            for author, count in authors.items():
+                totals[author] += count
+        repo_share = author_share(totals, login)
+
+        kept = []
+        for (file_path, importance), path in zip(ranked, paths):
+            share = author_share(authorship[path], login) if authorship.get(path) else repo_share
+            if share >= self.min_share:
+                kept.append((file_path, round(importance * share, 2), round(share, 3)))
+        kept.sort(key=lambda item: item[1], reverse=True)
+        kept = kept[:limit]
+        with self._lock:
+            self._stats['files_kept'] += len(kept)
+            # Files the unfiltered selection would have scored that someone else wrote
+            own = {file_path for file_path, _, _ in kept}
+            self._stats['files_dropped'] += sum(file_path not in own for file_path, _ in ranked[:limit])
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['auth_error'] = self._auth_error
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['ms_per_repo'] = round(stats['seconds'] / stats['repos'] * 1000, 1) if stats['repos'] else 0.0
+        return stats
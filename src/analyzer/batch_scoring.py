@@ -0,0 +1,279 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import namedtuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from analyzer.code_quality_analyzer import (
+    MODEL, TEMPERATURE, SCORE_PROMPT_VERSION, SUMMARY_PROMPT_VERSION, SCORE_RUBRIC, SUMMARY_INSTRUCTIONS,
+    extract_score, message_params, score_prompt, summary_prompt,
+)
+from analyzer.score_cache import get_score_cache
+from analyzer.token_budget import (
+    estimate_tokens, fit_to_budget, chunk_source, cap_chunks, FILE_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET, CHUNK_TOKENS,
+)
+
+# Provider limit is 100k requests per batch; stay well under it
+MAX_BATCH_REQUESTS = 10000
+# Seconds to wait for submitted batches before cancelling them; the provider
+# expires unfinished batches after 24 hours anyway
+MAX_BATCH_WAIT = 24 * 3600
+
+BatchResult = namedtuple(
+    'BatchResult',
+    ['custom_id', 'text', 'input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'],
+    defaults=(0, 0),
+)
+
+class AnthropicBatchBackend:
+    """Submits through the Message Batches API."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from analyzer.code_quality_analyzer import get_client
+            client = get_client()
+        # Older SDKs expose batches under the beta namespace
+        self.batches = getattr(client.messages, 'batches', None) or client.beta.messages.batches
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        return self.batches.create(requests=requests).id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.batches.retrieve(batch_id).processing_status == 'ended'
+
+    def cancel(self, batch_id: str):
+        self.batches.cancel(batch_id)
+
+    def results(self, batch_id: str) -> List[BatchResult]:
+        results = []
+        for entry in self.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                message = entry.result.message
+                results.append(BatchResult(
+                    entry.custom_id, message.content[0].text,
+                    message.usage.input_tokens, message.usage.output_tokens,
+                    getattr(message.usage, 'cache_creation_input_tokens', 0) or 0,
+                    getattr(message.usage, 'cache_read_input_tokens', 0) or 0,
+                ))
+            else:
+                results.append(BatchResult(entry.custom_id, None, 0, 0))
+        return results
+
+def fake_response(params: Dict[str, Any]) -> str:
+    # Deterministic stand-in answers: a score for score prompts, a stub otherwise
+    prompt = params['messages'][0]['content']
+    digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+    if params['system'] == SCORE_RUBRIC:
+        return f'{{"score": {digest % 10 + 1}}}'
+    return f"Stub summary of {len(prompt)} characters of code."
+
+class LocalBatchServer:
+    """
+    In-process stand-in for the batch API, for offline runs and tests.
+    Each batch completes `latency` seconds after submission on a background
+    thread, answering every request with `responder(params)`.
+    """
+
+    def __init__(self, responder: Callable[[Dict[str, Any]], str] = fake_response, latency: float = 0.0):
+        self.responder = responder
+        self.latency = latency
+        self._batches = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        batch_id = f"msgbatch_local_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._batches[batch_id] = None
+        threading.Thread(target=self._process, args=(batch_id, requests), daemon=True).start()
+        return batch_id
+
+    def _process(self, batch_id, requests):
+        time.sleep(self.latency)
+        results = []
+        for request in requests:
+            text = self.responder(request['params'])
+            prompt = request['params']['messages'][0]['content']
+            results.append(BatchResult(request['custom_id'], text, len(prompt) // 4, len(text) // 4))
+        with self._lock:
+            if batch_id not in self._cancelled:
+                self._batches[batch_id] = results
+
+    def is_done(self, batch_id: str) -> bool:
+        with self._lock:
+            return self._batches[batch_id] is not None
+
+    def cancel(self, batch_id: str):
+        with self._lock:
+            if self._batches[batch_id] is None:
+                self._cancelled.add(batch_id)
+                self._batches[batch_id] = []
+
+    def results(self, batch_id: str) -> List[BatchResult]:
+        with self._lock:
+            return self._batches[batch_id]
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def collect_requests(repos: Dict[str, Tuple[str, List[Dict[str, Any]]]], dedup_index=None):
+    """
+    Builds batch requests for every uncached file score and summary of the
+    given repos. Identical content (a file or a whole repo copied across
+    forks) is requested once; with a NearDuplicateIndex, near-duplicates of
+    a scored or already requested file reuse that score (or are skipped,
+    per the index's reuse_scores). Returns (requests, plan) where plan
+    records, per repo, the scores already known and which custom_ids carry
+    the rest.
+    """
+    cache = get_score_cache()
+    requests = []
+    plan = {}
+    requested = {}  # content digest -> custom_id, across every repo of the run
+    pending = {}  # file path -> custom_id, for near-duplicates within the run
+    for repo_idx, (key, (repo_path, important_files)) in enumerate(repos.items()):
+        # score_ids: (custom_id, content sent or None when shared, file path, signature)
+        entry = {'files': len(important_files), 'scores': [], 'score_ids': [], 'summary': None, 'summary_id': None}
+        plan[key] = entry
+        all_content = ''
+        for file_idx, file_info in enumerate(important_files):
+            file_path = os.path.join(repo_path, file_info['file'])
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+                raw = file.read()
+            all_content += raw
+            content = fit_to_budget(raw, FILE_TOKEN_BUDGET)
+
+            cached = cache.get('score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE) if cache else None
+            if cached is not None:
+                entry['scores'].append(cached)
+                continue
+            digest = _digest(content)
+            if digest in requested:
+                entry['score_ids'].append((requested[digest], None, file_path, None))
+                continue
+
+            signature = None
+            if dedup_index is not None:
+                signature = dedup_index.signature(content)
+                match = dedup_index.find_scored(signature, exclude=file_path)
+                shared = next((pending[k] for k, _ in dedup_index.query(signature) if k in pending), None)
+                if match or shared:
+                    dedup_index.insert(file_path, signature)
+                    if not dedup_index.reuse_scores:
+                        continue
+                    if match:
+                        entry['scores'].append(match[1])
+                    else:
+                        entry['score_ids'].append((shared, None, file_path, None))
+                    continue
+                dedup_index.insert(file_path, signature)
+
+            custom_id = f"r{repo_idx}-f{file_idx}"
+            requested[digest] = pending[file_path] = custom_id
+            entry['score_ids'].append((custom_id, content, file_path, signature))
+            requests.append({"custom_id": custom_id, "params": message_params(SCORE_RUBRIC, score_prompt(content), 100)})
+
+        if not important_files:
+            continue
+        # Batches are single-shot, so oversized repos are truncated to the
+        # summary budget at a def/class boundary rather than map-reduced
+        if estimate_tokens(all_content) > SUMMARY_TOKEN_BUDGET:
+            all_content = ''.join(cap_chunks(chunk_source(all_content, CHUNK_TOKENS), SUMMARY_TOKEN_BUDGET))
+        cached = cache.get('summary', all_content, SUMMARY_PROMPT_VERSION, MODEL, TEMPERATURE) if cache else None
+        if cached is not None:
+            entry['summary'] = cached
+            continue
+        digest = 'summary:' + _digest(all_content)
+        if digest in requested:
+            entry['summary_id'] = (requested[digest], None)
+            continue
+        custom_id = requested[digest] = f"r{repo_idx}-s"
+        entry['summary_id'] = (custom_id, all_content)
+        requests.append({"custom_id": custom_id, "params": message_params(SUMMARY_INSTRUCTIONS, summary_prompt(all_content), 600)})
+    return requests, plan
+
+def run_batches(backend, requests: List[Dict[str, Any]], poll_interval: float = 30.0,
+                usage: Optional[Dict[str, int]] = None, max_wait: float = MAX_BATCH_WAIT) -> Dict[str, Optional[str]]:
+    """
+    Submits requests in chunks of MAX_BATCH_REQUESTS and waits for all of
+    them. Batches still running after max_wait seconds are cancelled and
+    their requests count as failed.
+    """
+    batch_ids = [
+        backend.submit(requests[i:i + MAX_BATCH_REQUESTS])
+        for i in range(0, len(requests), MAX_BATCH_REQUESTS)
+    ]
+    print(f"Submitted {len(requests)} requests in {len(batch_ids)} batches")
+
+    deadline = time.monotonic() + max_wait
+    pending = list(batch_ids)
+    while pending:
+        pending = [batch_id for batch_id in pending if not backend.is_done(batch_id)]
+        if pending and time.monotonic() >= deadline:
+            print(f"Batches still running after {max_wait}s, cancelling {len(pending)}: {pending}")
+            for batch_id in pending:
+                backend.cancel(batch_id)
+            break
+        if pending:
+            time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+
+    texts = {}
+    for batch_id in batch_ids:
+        if batch_id in pending:
+            continue
+        for result in backend.results(batch_id):
+            texts[result.custom_id] = result.text
+            if usage is not None:
+                usage['requests'] = usage.get('requests', 0) + 1
+                for field in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'):
+                    usage[field] = usage.get(field, 0) + getattr(result, field)
+    return texts
+
+def score_repos_batch(repos, backend=None, poll_interval: float = 30.0, usage=None,
+                      dedup_index=None, max_wait: float = MAX_BATCH_WAIT):
+    """
+    Bulk counterpart of score_repos for overnight runs: every pending file
+    score and summary across all repos goes out as batch jobs, and results
+    are fanned back into the same per-repo (avg_score, analysis_rate,
+    summary) triples.
+    """
+    backend = backend or AnthropicBatchBackend()
+    requests, plan = collect_requests(repos, dedup_index)
+    texts = run_batches(backend, requests, poll_interval, usage, max_wait) if requests else {}
+    cache = get_score_cache()
+
+    outcomes = {}
+    for key, entry in plan.items():
+        if entry['files'] == 0:
+            outcomes[key] = (0, 0, 'nothing to analyze, skipping')
+            continue
+        scores = list(entry['scores'])
+        for custom_id, content, file_path, signature in entry['score_ids']:
+            score = extract_score(texts.get(custom_id) or '')
+            if score is None:
+                print(f"Failed to analyze {file_path}")
+                continue
+            scores.append(score)
+            if content is not None:
+                if cache:
+                    cache.put('score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE, score)
+                if dedup_index is not None:
+                    dedup_index.insert(file_path, signature, score)
+
+        summary = entry['summary']
+        if entry['summary_id']:
+            custom_id, content = entry['summary_id']
+            summary = (texts.get(custom_id) or '').strip() or None
+            if summary and cache and content is not None:
+                cache.put('summary', content, SUMMARY_PROMPT_VERSION, MODEL, TEMPERATURE, summary)
+        summary = summary or "Failed to generate summary."
+
+        if scores:
+            outcomes[key] = (sum(scores) / len(scores), (len(scores) / entry['files']) * 100, summary)
+        else:
+            outcomes[key] = (0, 0, summary)
+    return outcomes
@@ -2,16 +2,32 @@ import os
 import json
 import re
 import time
-import anthropic
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from anthropic import RateLimitError
+
+from analyzer.token_budget import (
+    estimate_tokens, fit_to_budget, chunk_source, cap_chunks,
+    FILE_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET, CHUNK_TOKENS, REPO_TOKEN_CAP,
+)
+from analyzer.score_cache import get_score_cache, prompt_version
+from tracing import bind, traced
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Anthropic client
-client = anthropic.Client(api_key=os.getenv("ANTHROPIC_API_KEY"))
+@lru_cache(maxsize=None)
+def get_client():
+    # Built on first use so importing this module needs neither the SDK nor a key
+    import anthropic
+    return anthropic.Client(api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+MODEL = "claude-3-sonnet-20240229"
+TEMPERATURE = 0.2
+
+# Input tokens allowed per packed request, leaving headroom in the context window
+PACKED_CONTEXT_BUDGET = 150000
 
 def extract_score(text):
     json_match = re.search(r'\{.*\}', text, re.DOTALL)
@@ -24,31 +40,92 @@ def extract_score(text):
     score_match = re.search(r'score.*?(\d+)', text, re.IGNORECASE)
     return int(score_match.group(1)) if score_match else None
 
-def analyze_file(file_path):
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-        content = file.read()
+_usage_lock = threading.Lock()
+
+def record_usage(usage, response):
+    if usage is None:
+        return
+    with _usage_lock:
+        _add_usage(usage, response)
+
+def _add_usage(usage, response):
+    usage['requests'] = usage.get('requests', 0) + 1
+    usage['input_tokens'] = usage.get('input_tokens', 0) + response.usage.input_tokens
+    usage['output_tokens'] = usage.get('output_tokens', 0) + response.usage.output_tokens
+    # Prompt-cache accounting; absent or None when nothing was cached
+    usage['cache_creation_input_tokens'] = usage.get('cache_creation_input_tokens', 0) + (
+        getattr(response.usage, 'cache_creation_input_tokens', 0) or 0)
+    usage['cache_read_input_tokens'] = usage.get('cache_read_input_tokens', 0) + (
+        getattr(response.usage, 'cache_read_input_tokens', 0) or 0)
+
+# Prompts are split into a fixed system prefix (rubric / instructions) and a
+# user message carrying only the code.
+SCORE_RUBRIC = """You are an expert code reviewer. Please analyze the Python code you are given and rate its quality on a scale from 1 to 10, where 1 is very poor quality and 10 is excellent quality. Consider factors such as readability, efficiency, adherence to PEP 8 style guide, proper use of Python idioms, and overall structure.
+
+Please respond with only a JSON object containing one key: 'score' (an integer from 1 to 10)."""
+
+SUMMARY_INSTRUCTIONS = """Please provide a concise summary (about 500 tokens) of the Python codebase you are given. Focus on the main functionality, key components, and overall structure of the code."""
+
+CHUNK_SUMMARY_INSTRUCTIONS = """Please provide a concise summary (about 200 tokens) of the part of a Python codebase you are given. Focus on the main functionality and key components defined in this part."""
+
+REDUCE_SUMMARY_INSTRUCTIONS = """You will be given summaries of consecutive parts of one Python codebase. Please combine them into a single concise summary (about 500 tokens) of the whole codebase. Focus on the main functionality, key components, and overall structure of the code."""
+
+def score_prompt(content):
+    return f"Code to analyze:\n\n{content}"
+
+def summary_prompt(content):
+    return f"Codebase to summarize:\n\n{content}"
+
+def chunk_summary_prompt(content):
+    return f"Part of the codebase to summarize:\n\n{content}"
+
+def reduce_summary_prompt(content):
+    return f"Summaries to combine:\n\n{content}"
 
-    prompt = f"""You are an expert code reviewer. Please analyze the following Python code and rate its quality on a scale from 1 to 10, where 1 is very poor quality and 10 is excellent quality. Consider factors such as readability, efficiency, adherence to PEP 8 style guide, proper use of Python idioms, and overall structure.
+SCORE_PROMPT_VERSION = prompt_version(lambda c: SCORE_RUBRIC + score_prompt(c))
+SUMMARY_PROMPT_VERSION = prompt_version(lambda c: SUMMARY_INSTRUCTIONS + summary_prompt(c))
+CHUNK_SUMMARY_PROMPT_VERSION = prompt_version(lambda c: CHUNK_SUMMARY_INSTRUCTIONS + chunk_summary_prompt(c))
+REDUCE_SUMMARY_PROMPT_VERSION = prompt_version(lambda c: REDUCE_SUMMARY_INSTRUCTIONS + reduce_summary_prompt(c))
 
-Code to analyze:
+def message_params(system, prompt, max_tokens):
+    # Fixed instructions go in the system prompt, the code alone in the user turn.
+    # No prompt-cache breakpoint: MODEL can't cache, and the rubrics are far
+    # below the minimum cacheable prefix length anyway
+    return {
+        "model": MODEL,
+        "max_tokens": max_tokens,
+        "temperature": TEMPERATURE,
+        "system": system,
+        "messages": [{"role": "user", "content": prompt}],
+    }
 
-{content}
+def create_message(params):
+    return get_client().messages.create(**params)
 
-Please respond with only a JSON object containing one key: 'score' (an integer from 1 to 10).
-"""
+@traced('llm.analyze_file')
+def analyze_file(file_path, usage=None):
+    from anthropic import RateLimitError
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+        content = fit_to_budget(file.read(), FILE_TOKEN_BUDGET)
+
+    cache = get_score_cache()
+    if cache:
+        cached = cache.get('score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE)
+        if cached is not None:
+            return {"score": cached, "analyzed": True}
+
+    params = message_params(SCORE_RUBRIC, score_prompt(content), 100)
 
     max_retries = 5
     for attempt in range(max_retries):
         print('attempting...')
         try:
-            response = client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=100,
-                temperature=0.2,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            response = create_message(params)
+            record_usage(usage, response)
             score = extract_score(response.content[0].text)
             if score is not None:
+                if cache:
+                    cache.put('score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE, score)
                 return {"score": score, "analyzed": True}
             else:
                 print(f"Failed to extract score for {file_path}. Retrying...")
@@ -67,27 +144,84 @@ Please respond with only a JSON object containing one key: 'score' (an integer f
     print(f"Failed to analyze {file_path} after {max_retries} attempts.")
     return {"score": None, "analyzed": False}
 
-def generate_summary(content):
-    prompt = f"""Please provide a concise summary (about 500 tokens) of the following Python codebase:
-
-{content}
-
-Focus on the main functionality, key components, and overall structure of the code.
-"""
+@traced('llm.summarize')
+def summarize(content, system, prompt_fn, version, max_tokens, kind, usage=None):
+    cache = get_score_cache()
+    if cache:
+        cached = cache.get(kind, content, version, MODEL, TEMPERATURE)
+        if cached is not None:
+            return cached
 
     try:
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=600,
-            temperature=0.2,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text.strip()
+        response = create_message(message_params(system, prompt_fn(content), max_tokens))
+        record_usage(usage, response)
+        summary = response.content[0].text.strip()
+        if cache:
+            cache.put(kind, content, version, MODEL, TEMPERATURE, summary)
+        return summary
     except Exception as e:
         print(f"Error generating summary: {str(e)}")
+        return None
+
+@traced('llm.generate_summary')
+def generate_summary(content, usage=None):
+    """
+    Summarises the codebase in one call when it fits SUMMARY_TOKEN_BUDGET.
+    Bigger inputs are capped at REPO_TOKEN_CAP, split at def/class
+    boundaries, summarised chunk by chunk in parallel and then reduced.
+    """
+    if estimate_tokens(content) <= SUMMARY_TOKEN_BUDGET:
+        summary = summarize(content, SUMMARY_INSTRUCTIONS, summary_prompt, SUMMARY_PROMPT_VERSION, 600, 'summary', usage)
+        return summary or "Failed to generate summary."
+
+    chunks = cap_chunks(chunk_source(content, CHUNK_TOKENS), REPO_TOKEN_CAP)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        partials = list(executor.map(
+            bind(lambda chunk: summarize(chunk, CHUNK_SUMMARY_INSTRUCTIONS, chunk_summary_prompt, CHUNK_SUMMARY_PROMPT_VERSION, 300, 'chunk_summary', usage)),
+            chunks
+        ))
+    partials = [p for p in partials if p]
+    if not partials:
         return "Failed to generate summary."
+    combined = "\n\n".join(f"Part {i + 1}:\n{p}" for i, p in enumerate(partials))
+    summary = summarize(combined, REDUCE_SUMMARY_INSTRUCTIONS, reduce_summary_prompt, REDUCE_SUMMARY_PROMPT_VERSION, 600, 'reduce_summary', usage)
+    return summary or "Failed to generate summary."
 
-def code_quality_analyze(repo_path, important_files):
+def score_file(file_path, content, dedup_index=None, usage=None):
+    """
+    Score of one file, or None when it failed or was skipped. With a
+    NearDuplicateIndex, a near-duplicate of an already scored file reuses
+    that score (or is skipped, per the index's reuse_scores) instead of
+    costing another LLM call.
+    """
+    signature = None
+    if dedup_index is not None:
+        signature = dedup_index.signature(content)
+        match = dedup_index.find_scored(signature, exclude=file_path)
+        if match:
+            dup_path, dup_score = match
+            dedup_index.insert(file_path, signature)
+            if dedup_index.reuse_scores:
+                print(f"Near-duplicate of {dup_path}, reusing score {dup_score}")
+                return dup_score
+            print(f"Near-duplicate of {dup_path}, skipping {file_path}")
+            return None
+
+    result = analyze_file(file_path, usage)
+    if not result["analyzed"]:
+        print(f"Failed to analyze {file_path}")
+        return None
+    print(f"Analyzed {file_path}: Score {result['score']}")
+    if dedup_index is not None:
+        dedup_index.insert(file_path, signature, result['score'])
+    return result['score']
+
+@traced('llm.code_quality_analyze', sample=True)
+def code_quality_analyze(repo_path, important_files, dedup_index=None, usage=None):
+    """
+    Scores the important files of a repo (see score_file for near-duplicate
+    handling) and summarises it.
+    """
     scores = []
     analyzed_files = 0
     if len(important_files) == 0:
@@ -103,17 +237,14 @@ def code_quality_analyze(repo_path, important_files):
                 content = file.read()
             all_content += content
 
-            result = analyze_file(file_path)
-            if result["analyzed"]:
-                scores.append(result['score'])
+            score = score_file(file_path, content, dedup_index, usage)
+            if score is not None:
+                scores.append(score)
                 analyzed_files += 1
-                print(f"Analyzed {file_path}: Score {result['score']}")
-            else:
-                print(f"Failed to analyze {file_path}")
         else:
             print(f"File not found: {file_path}")
     
-    summary = generate_summary(all_content)
+    summary = generate_summary(all_content, usage)
 
     if analyzed_files > 0:
         avg_score = sum(scores) / analyzed_files
@@ -122,6 +253,157 @@ def code_quality_analyze(repo_path, important_files):
     else:
         return 0, 0, summary
 
+PACKED_RUBRIC = """You are an expert code reviewer. Please analyze each of the Python files you are given and rate its quality on a scale from 1 to 10, where 1 is very poor quality and 10 is excellent quality. Consider factors such as readability, efficiency, adherence to PEP 8 style guide, proper use of Python idioms, and overall structure. Then provide a concise summary (about 500 tokens) of the codebase as a whole, focusing on the main functionality, key components, and overall structure of the code.
+
+Please respond with only a JSON object with two keys: 'files' (a list of objects, one per file given, each with 'file' set to the file name exactly as given and 'score' an integer from 1 to 10) and 'summary' (a string)."""
+
+def packed_prompt(files):
+    return "\n\n".join(f"### File: {name}\n{content}" for name, content in files)
+
+PACKED_PROMPT_VERSION = prompt_version(lambda content: PACKED_RUBRIC + packed_prompt([('', content)]))
+
+def pack_files(files, budget=PACKED_CONTEXT_BUDGET):
+    """
+    First-fit decreasing bin packing of (name, content) pairs into groups
+    whose estimated tokens fit the budget. A file bigger than the budget
+    gets a group of its own.
+    """
+    overhead = estimate_tokens(PACKED_RUBRIC)
+    bins = []
+    for name, content in sorted(files, key=lambda f: len(f[1]), reverse=True):
+        tokens = estimate_tokens(content) + 20  # file header
+        for group in bins:
+            if group['tokens'] + tokens <= budget:
+                group['files'].append((name, content))
+                group['tokens'] += tokens
+                break
+        else:
+            bins.append({'files': [(name, content)], 'tokens': overhead + tokens})
+    return [group['files'] for group in bins]
+
+def extract_packed(text):
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not json_match:
+        return {}, None
+    try:
+        result = json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return {}, None
+    scores = {}
+    for entry in result.get('files', []):
+        if isinstance(entry, dict) and isinstance(entry.get('score'), (int, float)):
+            scores[entry.get('file')] = entry['score']
+    return scores, result.get('summary')
+
+@traced('llm.analyze_packed')
+def analyze_packed(files, usage=None):
+    """
+    Scores a group of (name, content) files and summarises them in a single
+    request. Returns ({name: score}, summary); missing files were not scored.
+    """
+    from anthropic import RateLimitError
+    params = message_params(PACKED_RUBRIC, packed_prompt(files), 600 + 30 * len(files))
+    max_retries = 5
+    for attempt in range(max_retries):
+        try:
+            response = create_message(params)
+            record_usage(usage, response)
+            scores, summary = extract_packed(response.content[0].text)
+            if scores:
+                return scores, summary
+            print(f"Failed to extract packed scores for {len(files)} files. Retrying...")
+        except RateLimitError:
+            if attempt < max_retries - 1:
+                wait_time = 2 ** attempt  # Exponential backoff
+                print(f"Rate limit hit. Waiting for {wait_time} seconds before retrying...")
+                time.sleep(wait_time)
+        except Exception as e:
+            print(f"Error analyzing packed files: {str(e)}")
+            return {}, None
+    return {}, None
+
+@traced('llm.code_quality_analyze_packed', sample=True)
+def code_quality_analyze_packed(repo_path, important_files, dedup_index=None,
+                                budget=PACKED_CONTEXT_BUDGET, usage=None):
+    """
+    Packed counterpart of code_quality_analyze: the repo's files are
+    bin-packed into as few requests as the context budget allows, and each
+    request returns per-file scores plus the summary. Returns the same
+    (avg_score, analysis_rate, summary) triple; pass a dict as `usage` to
+    collect request and token counts.
+    """
+    if len(important_files) == 0:
+        return 0, 0, 'nothing to analyze, skipping'
+
+    scores = []
+    pending = []
+    contents = {}
+    signatures = {}
+    all_content = ''
+    # Set once a file is scored without being sent, leaving it out of the packed summaries
+    skipped = False
+    cache = get_score_cache()
+    for file_info in important_files:
+        file_path = os.path.join(repo_path, file_info['file'])
+        if not os.path.exists(file_path):
+            print(f"File not found: {file_path}")
+            continue
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+            content = file.read()
+        all_content += content
+
+        if cache:
+            cached = cache.get('packed_score', content, PACKED_PROMPT_VERSION, MODEL, TEMPERATURE)
+            if cached is not None:
+                scores.append(cached)
+                skipped = True
+                continue
+
+        if dedup_index is not None:
+            signatures[file_info['file']] = signature = dedup_index.signature(content)
+            match = dedup_index.find_scored(signature, exclude=file_path)
+            if match:
+                skipped = True
+                dedup_index.insert(file_path, signature)
+                if dedup_index.reuse_scores:
+                    scores.append(match[1])
+                continue
+        pending.append((file_info['file'], fit_to_budget(content, FILE_TOKEN_BUDGET)))
+        contents[file_info['file']] = content
+
+    summaries = []
+    for group in pack_files(pending, budget):
+        group_scores, summary = analyze_packed(group, usage)
+        if summary:
+            summaries.append(summary.strip())
+        for name, _ in group:
+            if name in group_scores:
+                scores.append(group_scores[name])
+                print(f"Analyzed {name}: Score {group_scores[name]}")
+                if cache:
+                    cache.put('packed_score', contents[name], PACKED_PROMPT_VERSION, MODEL, TEMPERATURE, group_scores[name])
+                if dedup_index is not None:
+                    dedup_index.insert(os.path.join(repo_path, name), signatures[name], group_scores[name])
+            else:
+                print(f"Failed to analyze {name}")
+
+    if skipped:
+        # Some files came from the cache or a near-duplicate, so the packed
+        # summaries only cover the rest; summarise the whole repo with the
+        # (itself cached) standalone summary call instead
+        summaries = [generate_summary(all_content, usage)]
+
+    if len(summaries) > 1:
+        # One partial summary per packed request; reduce them like the
+        # chunked path of generate_summary does
+        combined = "\n\n".join(f"Part {i + 1}:\n{p}" for i, p in enumerate(summaries))
+        reduced = summarize(combined, REDUCE_SUMMARY_INSTRUCTIONS, reduce_summary_prompt, REDUCE_SUMMARY_PROMPT_VERSION, 600, 'reduce_summary', usage)
+        summaries = [reduced or combined]
+    summary = summaries[0] if summaries else "Failed to generate summary."
+    if scores:
+        return sum(scores) / len(scores), (len(scores) / len(important_files)) * 100, summary
+    return 0, 0, summary
+
 def main():
     repos_dir = os.path.join('data', 'github_repos_python_files')
     
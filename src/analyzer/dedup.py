@@ -0,0 +1,125 @@
+import re
+import json
+import zlib
+import random
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Mersenne prime for the universal hash family; signature values fit in 32 bits
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+
+TOKEN_RE = re.compile(r'[A-Za-z_]\w*|\d+|[^\s\w]')
+COMMENT_RE = re.compile(r'#[^\n]*')
+
+def tokenize(content: str) -> List[str]:
+    # Comments and whitespace don't make two files different
+    return TOKEN_RE.findall(COMMENT_RE.sub('', content))
+
+def shingles(tokens: List[str], size: int = 5) -> set:
+    if len(tokens) < size:
+        return {zlib.crc32(' '.join(tokens).encode())} if tokens else set()
+    return {zlib.crc32(' '.join(tokens[i:i + size]).encode()) for i in range(len(tokens) - size + 1)}
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures with banded LSH over shingled token streams.
+
+    Signatures are stored as packed 32-bit arrays (num_perm * 4 bytes per
+    file), and inserts are incremental, so the index can grow to hundreds of
+    thousands of files across a whole crawl. Scores recorded for a file can be
+    looked up for any later near-duplicate of it.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 1, reuse_scores: bool = True):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        # reuse_scores=False means duplicates are skipped outright instead
+        self.reuse_scores = reuse_scores
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._signatures: Dict[str, array] = {}
+        self._buckets = defaultdict(list)
+        self.scores: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, content: str) -> array:
+        hashes = shingles(tokenize(content), self.shingle_size)
+        if not hashes:
+            return array('I', [_MASK] * self.num_perm)
+        return array('I', (
+            min(((a * h + b) % _PRIME) & _MASK for h in hashes)
+            for a, b in self._perms
+        ))
+
+    def _band_keys(self, sig: array):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, sig[start:start + self.rows].tobytes()
+
+    @staticmethod
+    def similarity(sig_a: array, sig_b: array) -> float:
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+    def query(self, sig: array) -> List[Tuple[str, float]]:
+        """Indexed keys whose estimated Jaccard similarity is at least the threshold."""
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(sig):
+                candidates.update(self._buckets.get(band_key, ()))
+            matches = [(key, self.similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted(
+            [(key, sim) for key, sim in matches if sim >= self.threshold],
+            key=lambda m: m[1], reverse=True,
+        )
+
+    def insert(self, key: str, sig: array, score: Optional[float] = None):
+        with self._lock:
+            if key not in self._signatures:
+                self._signatures[key] = sig
+                for band_key in self._band_keys(sig):
+                    self._buckets[band_key].append(key)
+            if score is not None:
+                self.scores[key] = score
+
+    def find_scored(self, sig: array, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Closest near-duplicate that already has a score, as (key, score)."""
+        for key, _ in self.query(sig):
+            if key != exclude and key in self.scores:
+                return key, self.scores[key]
+        return None
+
+    def save(self, path: str):
+        with self._lock:
+            data = {
+                'params': [self.num_perm, self.bands, self.threshold, self.shingle_size, self.seed],
+                'signatures': {key: sig.tobytes().hex() for key, sig in self._signatures.items()},
+                'scores': self.scores,
+            }
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str, reuse_scores: bool = True) -> 'NearDuplicateIndex':
+        with open(path) as f:
+            data = json.load(f)
+        num_perm, bands, threshold, shingle_size, seed = data['params']
+        index = cls(num_perm, bands, threshold, shingle_size, seed, reuse_scores)
+        for key, hex_sig in data['signatures'].items():
+            sig = array('I')
+            sig.frombytes(bytes.fromhex(hex_sig))
+            index.insert(key, sig, data['scores'].get(key))
+        return index
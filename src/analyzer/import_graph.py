@@ -0,0 +1,177 @@
+import os
+import re
+import ast
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Line-level import scanner, the fallback for files ast can't parse (py2
+# code, notebooks exported to .py)
+IMPORT_RE = re.compile(
+    r'^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([^#\n]*)|import[ \t]+([^#\n]+))',
+    re.MULTILINE,
+)
+
+def module_name(relative_path: str) -> str:
+    parts = list(Path(relative_path).with_suffix('').parts)
+    if parts and parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+def source_roots(relative_paths: List[str]) -> List[str]:
+    """
+    Directories absolute imports are resolved from: the repo root, src/
+    when it holds modules, and every directory holding a top-level package
+    (one whose parent has no __init__.py).
+    """
+    packages = {os.path.dirname(rel) for rel in relative_paths if os.path.basename(rel) == '__init__.py'}
+    roots = {''}
+    for rel in relative_paths:
+        if Path(rel).parts[0] == 'src' and len(Path(rel).parts) > 1:
+            roots.add('src')
+            break
+    for package in packages:
+        if package and os.path.dirname(package) not in packages:
+            roots.add(os.path.dirname(package))
+    return sorted(roots, key=lambda root: (len(Path(root).parts), root))
+
+def build_root_index(relative_paths: List[str], roots: List[str]) -> Dict[str, str]:
+    """Maps the dotted name of each module, as importable from each source root, to the file."""
+    index = {}
+    for root in roots:
+        for rel in relative_paths:
+            if not root:
+                index.setdefault(module_name(rel), rel)
+            elif rel.startswith(root + os.sep):
+                index.setdefault(module_name(os.path.relpath(rel, root)), rel)
+    index.pop('', None)
+    return index
+
+def build_module_index(relative_paths: List[str]) -> Dict[str, str]:
+    """
+    Maps every dotted suffix of each module path to the file, so that
+    `pkg.mod` resolves to `src/pkg/mod.py` without knowing the source root.
+    Longer (more specific) paths win on collisions. Only used for relative
+    imports, which can't name a module outside the repo.
+    """
+    index = {}
+    for rel in sorted(relative_paths, key=lambda p: len(Path(p).parts), reverse=True):
+        parts = module_name(rel).split('.')
+        for i in range(len(parts)):
+            index.setdefault('.'.join(parts[i:]), rel)
+    index.pop('', None)
+    return index
+
+def _resolve(name: str, index: Dict[str, str]) -> Optional[str]:
+    while name:
+        if name in index:
+            return index[name]
+        name = name.rpartition('.')[0]
+    return None
+
+def _from_base(package: List[str], level: int, module: str) -> str:
+    # Absolute dotted name of `from <level dots><module> import ...`
+    if not level:
+        return module
+    anchor = package[:len(package) - (level - 1)] if level - 1 <= len(package) else []
+    return '.'.join(anchor + ([module] if module else []))
+
+def _scan_regex(content: str, package: List[str]) -> List[Tuple[str, bool]]:
+    names = []
+    for from_mod, from_names, plain in IMPORT_RE.findall(content):
+        if plain:
+            for item in plain.split(','):
+                item = item.split(' as ')[0].strip()
+                if item:
+                    names.append((item, False))
+            continue
+
+        dots = len(from_mod) - len(from_mod.lstrip('.'))
+        base = _from_base(package, dots, from_mod[dots:])
+        for item in from_names.rstrip(')').split(','):
+            item = item.split(' as ')[0].strip()
+            if item and item != '*':
+                names.append((f"{base}.{item}" if base else item, bool(dots)))
+        if base:
+            names.append((base, bool(dots)))
+    return names
+
+def scan_imports(content: str, relative_path: str) -> List[Tuple[str, bool]]:
+    """Dotted names a module imports, as (name, relative) pairs; relative ones are made absolute."""
+    package = module_name(relative_path).split('.') if module_name(relative_path) else []
+    if not relative_path.endswith('__init__.py'):
+        package = package[:-1]
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return _scan_regex(content, package)
+
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend((alias.name, False) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = _from_base(package, node.level, node.module or '')
+            relative = bool(node.level)
+            for alias in node.names:
+                if alias.name != '*':
+                    names.append((f"{base}.{alias.name}" if base else alias.name, relative))
+            if base:
+                names.append((base, relative))
+    return names
+
+def build_import_graph(repo_path: str, relative_paths: List[str]) -> Dict[str, Set[str]]:
+    """
+    Returns {module: set of intra-repo modules it imports}. Absolute imports
+    resolve only from the detected source roots, so `import utils` doesn't
+    hit some nested `pkg/utils.py`; relative imports match by suffix.
+    """
+    root_index = build_root_index(relative_paths, source_roots(relative_paths))
+    suffix_index = build_module_index(relative_paths)
+    graph = {rel: set() for rel in relative_paths}
+    for rel in relative_paths:
+        with open(os.path.join(repo_path, rel), 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        for name, relative in scan_imports(content, rel):
+            target = _resolve(name, suffix_index if relative else root_index)
+            if target and target != rel:
+                graph[rel].add(target)
+    return graph
+
+def pagerank(graph: Dict[str, Set[str]], damping: float = 0.85, max_iter: int = 100, tol: float = 1e-8) -> Dict[str, float]:
+    """
+    PageRank over import edges: a module imported by many (important) modules
+    scores high. Dangling nodes spread their rank uniformly.
+    """
+    nodes = list(graph)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    incoming = defaultdict(list)
+    for src, targets in graph.items():
+        for dst in targets:
+            incoming[dst].append(src)
+    out_degree = {node: len(graph[node]) for node in nodes}
+
+    rank = dict.fromkeys(nodes, 1.0 / n)
+    for _ in range(max_iter):
+        dangling = sum(rank[node] for node in nodes if out_degree[node] == 0)
+        base = (1.0 - damping) / n + damping * dangling / n
+        new_rank = {
+            node: base + damping * sum(rank[src] / out_degree[src] for src in incoming[node])
+            for node in nodes
+        }
+        delta = sum(abs(new_rank[node] - rank[node]) for node in nodes)
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank
+
+def centrality_scores(repo_path: str, relative_paths: List[str]) -> Dict[str, float]:
+    """
+    PageRank normalised so the average module scores 1.0, which makes it
+    usable as a multiplier on the heuristic importance.
+    """
+    ranks = pagerank(build_import_graph(repo_path, relative_paths))
+    n = len(ranks)
+    return {rel: rank * n for rel, rank in ranks.items()}
@@ -0,0 +1,179 @@
+import os
+import ast
+import json
+from collections import Counter
+from typing import Dict, List, Any, Optional
+
+# Repos whose prescreen score falls below this are dropped before any LLM call
+PRESCREEN_THRESHOLD = 0.4
+
+METRIC_WEIGHTS = {
+    'complexity': 0.25,
+    'docstrings': 0.2,
+    'type_hints': 0.2,
+    'comments': 0.15,
+    'uniqueness': 0.2,
+}
+
+BRANCH_NODES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+    ast.With, ast.AsyncWith, ast.Assert, ast.comprehension,
+) + ((ast.match_case,) if hasattr(ast, 'match_case') else ())  # match needs 3.10
+
+def cyclomatic_complexity(func) -> int:
+    complexity = 1
+    for node in ast.walk(func):
+        if isinstance(node, BRANCH_NODES):
+            complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            complexity += len(node.values) - 1
+    return complexity
+
+def _annotation_coverage(func) -> float:
+    args = func.args
+    params = [a for a in args.posonlyargs + args.args + args.kwonlyargs if a.arg not in ('self', 'cls')]
+    if args.vararg:
+        params.append(args.vararg)
+    if args.kwarg:
+        params.append(args.kwarg)
+    annotated = sum(1 for a in params if a.annotation is not None) + (func.returns is not None)
+    return annotated / (len(params) + 1)
+
+def file_metrics(content: str) -> Dict[str, float]:
+    """
+    Cheap static metrics for one file, each normalised to [0, 1] where higher
+    is better, or None where it doesn't apply (no functions to measure
+    complexity or type hints on, no definitions to document). Files that
+    don't parse score 0 across the board.
+    """
+    lines = [line.strip() for line in content.splitlines()]
+    code_lines = [line for line in lines if line and not line.startswith('#')]
+    comment_lines = sum(1 for line in lines if line.startswith('#'))
+
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return dict.fromkeys(METRIC_WEIGHTS, 0.0) | {'syntax_valid': 0.0}
+
+    funcs = [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    classes = [n for n in ast.walk(tree) if isinstance(n, ast.ClassDef)]
+    definitions = funcs + classes
+
+    if funcs:
+        avg_complexity = sum(cyclomatic_complexity(f) for f in funcs) / len(funcs)
+        # Anything up to 10 is fine; past that, decay to 0 at 30
+        complexity = 1.0 if avg_complexity <= 10 else max(0.0, 1 - (avg_complexity - 10) / 20)
+        type_hints = sum(_annotation_coverage(f) for f in funcs) / len(funcs)
+    else:
+        # Top-level scripts and exported notebooks: judged on the other metrics
+        complexity = None
+        type_hints = None
+
+    docstrings = (
+        sum(1 for d in definitions if ast.get_docstring(d)) / len(definitions)
+        if definitions else None
+    )
+
+    ratio = comment_lines / max(len(code_lines) + comment_lines, 1)
+    comments = min(ratio / 0.05, 1.0) if ratio <= 0.3 else max(0.0, 1 - (ratio - 0.3) / 0.4)
+
+    # Repeated non-trivial lines (copy-paste blocks, generated code)
+    counts = Counter(line for line in code_lines if len(line) > 10)
+    duplicates = sum(c - 1 for c in counts.values() if c > 1)
+    uniqueness = 1 - duplicates / max(len(code_lines), 1)
+
+    return {
+        'complexity': complexity,
+        'docstrings': docstrings,
+        'type_hints': type_hints,
+        'comments': comments,
+        'uniqueness': uniqueness,
+        'syntax_valid': 1.0,
+    }
+
+def score_metrics(metrics: Dict[str, Optional[float]]) -> float:
+    """Weighted mean over the metrics that apply to the file, so scripts aren't penalised for missing ones."""
+    applicable = {k: w for k, w in METRIC_WEIGHTS.items() if metrics[k] is not None}
+    if not applicable:
+        return 0.0
+    return metrics['syntax_valid'] * sum(metrics[k] * w for k, w in applicable.items()) / sum(applicable.values())
+
+def prescreen_repository(repo_path: str, important_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Scores the ranked files of a repo without calling the LLM. Returns the
+    mean per-file score (see score_metrics) along with the mean of each
+    metric over the files it applies to.
+    """
+    import numpy as np
+
+    rows = []
+    for file_info in important_files:
+        file_path = os.path.join(repo_path, file_info['file'])
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            rows.append(file_metrics(f.read()))
+
+    if not rows:
+        return {'score': 0.0, 'files': 0, 'metrics': {}}
+
+    # files x metrics, NaN where a metric doesn't apply; scored in one pass
+    names = list(METRIC_WEIGHTS)
+    values = np.array([[np.nan if row[k] is None else row[k] for k in names] for row in rows], dtype=np.float64)
+    applies = ~np.isnan(values)
+    weights = np.array([METRIC_WEIGHTS[k] for k in names])
+    weight_sums = applies @ weights
+    syntax_valid = np.array([row['syntax_valid'] for row in rows])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.where(weight_sums > 0, np.nan_to_num(values) @ weights / weight_sums, 0.0) * syntax_valid
+    counts = applies.sum(axis=0)
+    means = np.nan_to_num(values).sum(axis=0) / np.maximum(counts, 1)
+
+    metrics = {k: (round(float(m), 4) if n else None) for k, m, n in zip(names, means, counts)}
+    metrics['syntax_valid'] = round(float(syntax_valid.mean()), 4)
+    return {
+        'score': round(float(scores.mean()), 4),
+        'files': len(rows),
+        'metrics': metrics,
+    }
+
+def prescreen_tradeoff(results: List[Dict[str, Any]], thresholds=None, good_score: float = 6.0) -> List[Dict[str, float]]:
+    """
+    Precision/recall of the prescreen gate against LLM scores. `results` are
+    repo results carrying both 'prescreen_score' and 'average_score' (i.e.
+    repos that were scored with the gate disabled). A repo is "good" when its
+    LLM average is at least `good_score`; recall is the share of good repos
+    the gate keeps, and llm_calls_saved the share of repos it drops.
+    """
+    thresholds = thresholds or [i / 20 for i in range(0, 13)]
+    labelled = [
+        (r['prescreen_score'], r['average_score'] >= good_score)
+        for r in results
+        if r.get('prescreen_score') is not None and r.get('analysis_rate')
+    ]
+    total_good = sum(1 for _, good in labelled if good)
+
+    report = []
+    for threshold in thresholds:
+        kept = [good for score, good in labelled if score >= threshold]
+        true_pos = sum(kept)
+        report.append({
+            'threshold': threshold,
+            'precision': true_pos / len(kept) if kept else 0.0,
+            'recall': true_pos / total_good if total_good else 0.0,
+            'llm_calls_saved': 1 - len(kept) / len(labelled) if labelled else 0.0,
+        })
+    return report
+
+if __name__ == "__main__":
+    # Reads users/*/repo_quality_scores.json written by explore.py
+    results = []
+    for user in os.listdir('users'):
+        scores_path = os.path.join('users', user, 'repo_quality_scores.json')
+        if os.path.exists(scores_path):
+            with open(scores_path) as f:
+                results.extend(json.load(f).values())
+
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'saved':>6}")
+    for row in prescreen_tradeoff(results):
+        print(f"{row['threshold']:>9.2f} {row['precision']:>9.2f} {row['recall']:>7.2f} {row['llm_calls_saved']:>6.2f}")
@@ -8,10 +8,22 @@ import re
 from pathspec import PathSpec
 from pathspec.patterns import GitWildMatchPattern
 
+from analyzer.import_graph import centrality_scores
+from analyzer.token_budget import estimate_tokens
+from tracing import traced
+
+RANKERS = ('heuristic', 'centrality')
+
+# Tool, cache and build-output directories that never hold the candidate's
+# code; anything else (vendored code, migrations) is left to the repo's
+# .gitignore. Virtualenvs are recognised by their pyvenv.cfg, whatever their name
+IGNORED_DIRS = frozenset({'.git', '__pycache__', 'node_modules', 'site-packages', 'build', 'dist'})
+IGNORED_DIR_SUFFIXES = ('.egg-info',)
+
 def load_gitignore(repo_path):
     gitignore_path = os.path.join(repo_path, '.gitignore')
     if os.path.exists(gitignore_path):
-        with open(gitignore_path, 'r') as f:
+        with open(gitignore_path, 'r', errors='ignore') as f:
             return PathSpec.from_lines(GitWildMatchPattern, f)
     return None
 
@@ -24,6 +36,56 @@ def should_analyze_file(file_path, repo_path, gitignore_spec):
             return False
     return True
 
+def _is_ignored(relative_path, specs):
+    # specs are (base, PathSpec) pairs from the .gitignore files above this
+    # path, outermost first; patterns in a nested .gitignore are relative to
+    # its own directory. As in git, the last matching pattern wins, so a
+    # nested `!pattern` re-includes what a parent .gitignore excluded
+    ignored = False
+    for base, spec in specs:
+        path = relative_path[len(base):]
+        for pattern in spec.patterns:
+            if pattern.include is not None and pattern.match_file(path) is not None:
+                ignored = pattern.include
+    return ignored
+
+def iter_repo_files(repo_path, extension='.py'):
+    """
+    Yields paths of files under repo_path ending in `extension`, pruning
+    ignored directories before descending into them. Honours .gitignore at
+    every level (negations included), the IGNORED_DIRS tool directories, and
+    skips any directory that contains a pyvenv.cfg (a checked-in virtualenv
+    under any name).
+    """
+    stack = [(repo_path, '', ())]
+    while stack:
+        dir_path, rel_dir, specs = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        names = {entry.name for entry in entries}
+        if rel_dir and 'pyvenv.cfg' in names:
+            continue
+        if '.gitignore' in names:
+            spec = load_gitignore(dir_path)
+            if spec:
+                specs = specs + ((rel_dir, spec),)
+
+        for entry in entries:
+            rel = rel_dir + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in IGNORED_DIRS or entry.name.endswith(IGNORED_DIR_SUFFIXES):
+                    continue
+                if _is_ignored(rel + '/', specs):
+                    continue
+                stack.append((entry.path, rel + '/', specs))
+            elif entry.name.endswith(extension) and entry.is_file():
+                if not _is_ignored(rel, specs):
+                    yield entry.path
+
 def calculate_file_importance(file_path, repo_path):
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
@@ -62,24 +124,70 @@ def calculate_file_importance(file_path, repo_path):
     
     return max(importance, 0)  # Ensure non-negative importance
 
-def analyze_repository(repo_path):
-    gitignore_spec = load_gitignore(repo_path)
+@traced('analyze.analyze_repository', sample=True)
+def analyze_repository(repo_path, ranker='heuristic', limit=20):
+    """
+    Ranks the repo's .py files by importance and returns the top `limit` as
+    (file_path, importance) pairs. ranker='centrality' scales the heuristic
+    score by the module's PageRank in the intra-repo import graph, so files
+    the rest of the code depends on float to the top.
+    """
+    if ranker not in RANKERS:
+        raise ValueError(f"Unknown ranker {ranker!r}, expected one of {RANKERS}")
+
     file_importance = defaultdict(int)
+    modules = []
     
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                if should_analyze_file(file_path, repo_path, gitignore_spec):
-                    importance = calculate_file_importance(file_path, repo_path)
-                    file_importance[file_path] = importance
+    # .gitignore and deny-list filtering happen inside the walker
+    for file_path in iter_repo_files(repo_path):
+        modules.append(file_path)
+        if should_analyze_file(file_path, repo_path, None):
+            importance = calculate_file_importance(file_path, repo_path)
+            file_importance[file_path] = importance
+
+    if ranker == 'centrality' and file_importance:
+        # __init__.py files aren't scored but stay in the graph, since
+        # package-level imports go through them
+        centrality = centrality_scores(
+            repo_path, [os.path.relpath(path, repo_path) for path in modules]
+        )
+        for file_path in file_importance:
+            rel = os.path.relpath(file_path, repo_path)
+            file_importance[file_path] = round(file_importance[file_path] * centrality[rel], 2)
     
-    # Sort files by importance and get top 20
-    top_files = sorted(file_importance.items(), key=lambda x: x[1], reverse=True)[:20]
+    # Sort files by importance and get top `limit`
+    top_files = sorted(file_importance.items(), key=lambda x: x[1], reverse=True)[:limit]
     
     return top_files
 
+def compare_rankers(repo_path, top_files_limit=3):
+    """
+    Side-by-side report of the heuristic and centrality rankers: which files
+    each would send to the LLM, the estimated prompt tokens, and how much
+    the two selections agree (Jaccard overlap of the top files).
+    """
+    report = {}
+    selections = {}
+    for ranker in RANKERS:
+        top_files = analyze_repository(repo_path, ranker=ranker, limit=top_files_limit)
+        tokens = 0
+        for file_path, _ in top_files:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                tokens += estimate_tokens(f.read())
+        selections[ranker] = {file_path for file_path, _ in top_files}
+        report[ranker] = {
+            'files': [os.path.relpath(file_path, repo_path) for file_path, _ in top_files],
+            'tokens': tokens,
+        }
+
+    union = selections['heuristic'] | selections['centrality']
+    shared = selections['heuristic'] & selections['centrality']
+    report['agreement'] = len(shared) / len(union) if union else 1.0
+    return report
+
 
 if __name__ == "__main__":
-    pass
-    #main()
\ No newline at end of file
+    import sys
+    if len(sys.argv) > 1:
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        print(json.dumps(compare_rankers(sys.argv[1], limit), indent=2))
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = 'llm_cache.sqlite'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Rough per-row footprint beyond the value itself (key, columns, index)
+ROW_OVERHEAD = 160
+# Hits whose last_used update is held back and written in one transaction
+TOUCH_BATCH = 256
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+
+def prompt_version(template_fn) -> str:
+    """
+    Fingerprint of a prompt template, taken by rendering it with empty
+    content. Editing the template changes the version, which invalidates
+    every entry written under the old one.
+    """
+    return content_hash(template_fn(''))[:16]
+
+class ScoreCache:
+    """
+    Persistent cache of LLM results in SQLite, keyed by content hash, prompt
+    version, model and temperature. Least recently used entries are evicted
+    once the stored values exceed max_bytes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)')
+        self._conn.commit()
+        self._bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM llm_cache').fetchone()[0]
+
+    @staticmethod
+    def make_key(kind: str, content: str, version: str, model: str, temperature: float) -> str:
+        return content_hash(f"{kind}\0{version}\0{model}\0{temperature}\0{content_hash(content)}")
+
+    def get(self, kind: str, content: str, version: str, model: str, temperature: float) -> Optional[Any]:
+        key = self.make_key(kind, content, version, model, temperature)
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Reads don't commit; last_used goes out with the next write or batch
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touches()
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def _flush_touches(self):
+        if self._touched:
+            self._conn.executemany(
+                'UPDATE llm_cache SET last_used = ? WHERE key = ?', [(t, key) for key, t in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def put(self, kind: str, content: str, version: str, model: str, temperature: float, value: Any):
+        key = self.make_key(kind, content, version, model, temperature)
+        encoded = json.dumps(value)
+        size = len(encoded) + ROW_OVERHEAD
+        now = time.time()
+        with self._lock:
+            self._flush_touches()
+            old = self._conn.execute('SELECT size FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, kind, model, version, temperature, encoded, size, now, now)
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries down to 90% of the budget
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute('SELECT key, size FROM llm_cache ORDER BY last_used').fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self._conn.executemany('DELETE FROM llm_cache WHERE key = ?', doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
+
+@lru_cache(maxsize=None)
+def get_score_cache() -> Optional[ScoreCache]:
+    """Process-wide cache; set LLM_CACHE_PATH to an empty string to disable."""
+    path = os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    max_bytes = int(os.getenv('LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    return ScoreCache(path, max_bytes)
@@ -0,0 +1,169 @@
+import os
+import math
+from statistics import NormalDist
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tracing import bind, traced
+
+# Candidates whose mean file score is confidently above this are shortlisted
+SHORTLIST_THRESHOLD = 7.0
+# Two-sided confidence of the interval that decides when to stop
+CONFIDENCE = 0.9
+# Files scored before any decision, so one outlier can't settle it
+MIN_FILES = 3
+# Files scored concurrently between decisions
+WAVE_SIZE = 3
+# Within-candidate score variance assumed before any data, worth PRIOR_WEIGHT
+# observations; keeps two equal early scores from giving a zero-width interval
+PRIOR_VARIANCE = 2.25
+PRIOR_WEIGHT = 2
+
+class SequentialEstimate:
+    """
+    Running mean of a candidate's file scores with a confidence interval.
+    The variance is shrunk toward PRIOR_VARIANCE, and a finite-population
+    correction narrows the interval to zero once every candidate file is
+    scored, so stopping never changes an exhaustive verdict.
+    """
+
+    def __init__(self, population: int, threshold: float = SHORTLIST_THRESHOLD,
+                 confidence: float = CONFIDENCE, min_files: int = MIN_FILES):
+        self.population = population
+        self.threshold = threshold
+        self.min_files = min_files
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, score: float):
+        # Welford's update
+        self.n += 1
+        delta = score - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (score - self.mean)
+
+    def interval(self) -> Tuple[float, float]:
+        if self.n == 0:
+            return -math.inf, math.inf
+        variance = (PRIOR_VARIANCE * PRIOR_WEIGHT + self._m2) / (PRIOR_WEIGHT + self.n - 1)
+        fpc = (self.population - self.n) / (self.population - 1) if self.population > 1 else 0.0
+        half = self.z * math.sqrt(variance / self.n * max(fpc, 0.0))
+        return self.mean - half, self.mean + half
+
+    def decision(self) -> Optional[str]:
+        """'above' or 'below' the threshold once the interval excludes it, else None."""
+        if self.n < min(self.min_files, self.population):
+            return None
+        low, high = self.interval()
+        if low > self.threshold:
+            return 'above'
+        if high < self.threshold:
+            return 'below'
+        return None
+
+def interleave(repo_files: Dict[str, List[Any]]) -> List[Tuple[str, Any]]:
+    """
+    Round-robin over repos (in the given order) of their files (in
+    importance order): the most important file of every repo comes before
+    any repo's second, so early scores cover the whole candidate.
+    """
+    order = []
+    depth = max((len(files) for files in repo_files.values()), default=0)
+    for i in range(depth):
+        for repo, files in repo_files.items():
+            if i < len(files):
+                order.append((repo, files[i]))
+    return order
+
+def replay(repo_scores: Dict[str, List[float]], threshold: float = SHORTLIST_THRESHOLD,
+           confidence: float = CONFIDENCE, min_files: int = MIN_FILES,
+           wave_size: int = WAVE_SIZE) -> Tuple[SequentialEstimate, int, Optional[str]]:
+    """
+    Runs the stopping rule over already known scores ({repo: scores in
+    importance order}); returns the estimate, the number of scores it
+    consumed and the decision. Mirrors score_candidate_sequential.
+    """
+    order = interleave(repo_scores)
+    estimate = SequentialEstimate(len(order), threshold, confidence, min_files)
+    used = 0
+    while used < len(order):
+        for _, score in order[used:used + wave_size]:
+            estimate.add(score)
+        used = min(used + wave_size, len(order))
+        decision = estimate.decision()
+        if decision:
+            return estimate, used, decision
+    return estimate, used, 'above' if estimate.mean > threshold else 'below'
+
+@traced('llm.score_candidate_sequential', sample=True)
+def score_candidate_sequential(to_score: Dict[str, Tuple[str, List[Dict[str, Any]]]], dedup_index=None,
+                               usage=None, threshold: float = SHORTLIST_THRESHOLD,
+                               confidence: float = CONFIDENCE, min_files: int = MIN_FILES,
+                               wave_size: int = WAVE_SIZE) -> Tuple[Dict[str, Tuple[float, float, str]], Dict[str, Any]]:
+    """
+    Scores one candidate's files ({repo_url: (repo_path, importance
+    result)}, repos in priority order) in waves of wave_size, most important
+    first, and stops as soon as the candidate is confidently above or below
+    the threshold. Only shortlisted candidates get repo summaries.
+
+    Returns ({repo_url: (avg_score, analysis_rate, summary)}, report); the
+    analysis rate reflects the files actually scored.
+    """
+    from analyzer.code_quality_analyzer import score_file, generate_summary
+
+    order = []
+    for repo_url, file_info in interleave({url: files for url, (_, files) in to_score.items()}):
+        path = os.path.join(to_score[repo_url][0], file_info['file'])
+        if os.path.exists(path):
+            order.append((repo_url, path))
+    estimate = SequentialEstimate(len(order), threshold, confidence, min_files)
+    repo_scores = {repo_url: [] for repo_url in to_score}
+    contents = {repo_url: [] for repo_url in to_score}
+
+    def score(item):
+        repo_url, path = item
+        with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+            content = file.read()
+        return repo_url, content, score_file(path, content, dedup_index, usage)
+
+    used, decision = 0, None
+    with ThreadPoolExecutor(max_workers=wave_size) as executor:
+        while used < len(order) and decision is None:
+            wave = order[used:used + wave_size]
+            for repo_url, content, file_score in executor.map(bind(score), wave):
+                contents[repo_url].append(content)
+                if file_score is not None:
+                    repo_scores[repo_url].append(file_score)
+                    estimate.add(file_score)
+            used += len(wave)
+            decision = estimate.decision()
+    if decision is None:
+        decision = 'above' if estimate.mean > threshold else 'below'
+
+    outcomes = {}
+    for repo_url, (_, important_files) in to_score.items():
+        scores = repo_scores[repo_url]
+        if decision == 'above' and contents[repo_url]:
+            summary = generate_summary(''.join(contents[repo_url]), usage)
+        elif not contents[repo_url]:
+            summary = 'not reached before the verdict, skipping'
+        else:
+            summary = f'stopped early: below shortlist threshold {threshold}'
+        if scores:
+            outcomes[repo_url] = (sum(scores) / len(scores), len(scores) / len(important_files) * 100, summary)
+        else:
+            outcomes[repo_url] = (0, 0, summary)
+
+    low, high = estimate.interval()
+    report = {
+        'decision': decision,
+        'estimate': round(estimate.mean, 3),
+        'interval': (round(low, 3), round(high, 3)),
+        'files_scored': used,
+        'files_total': len(order),
+    }
+    print(f"Sequential scoring: {decision} {threshold} after {used}/{len(order)} files, "
+          f"mean {estimate.mean:.2f} [{low:.2f}, {high:.2f}]")
+    return outcomes, report
@@ -0,0 +1,86 @@
+import ast
+from typing import List
+
+# Largest single file sent for scoring; bigger files are cut at a def/class boundary
+FILE_TOKEN_BUDGET = 20000
+# Summaries over this size go through map-reduce instead of a single prompt
+SUMMARY_TOKEN_BUDGET = 30000
+# Size of each map-phase chunk
+CHUNK_TOKENS = 12000
+# Hard cap on summary input per repo; content past it is dropped
+REPO_TOKEN_CAP = 120000
+
+def estimate_tokens(text):
+    # ~4 characters per token for source code; good enough for budgeting
+    return len(text) // 4
+
+def _split_lines(lines: List[str], max_tokens: int) -> List[str]:
+    chunks, current, size = [], [], 0
+    for line in lines:
+        tokens = estimate_tokens(line) + 1
+        if current and size + tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def chunk_source(content: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Splits Python source into chunks of at most ~max_tokens, cutting only
+    between top-level statements so functions and classes stay whole. A
+    single definition bigger than the budget, or source that doesn't parse,
+    falls back to splitting on lines.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return [content] if content else []
+
+    lines = content.splitlines(keepends=True)
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return _split_lines(lines, max_tokens)
+
+    # Top-level statement spans, with leading decorators/comments attached
+    starts = [min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])]) - 1
+              for node in tree.body]
+    if not starts:
+        return _split_lines(lines, max_tokens)
+    starts[0] = 0
+    spans = [''.join(lines[start:end]) for start, end in zip(starts, starts[1:] + [len(lines)])]
+
+    chunks, current, size = [], [], 0
+    for span in spans:
+        tokens = estimate_tokens(span)
+        if tokens > max_tokens:
+            if current:
+                chunks.append(''.join(current))
+                current, size = [], 0
+            chunks.extend(_split_lines(span.splitlines(keepends=True), max_tokens))
+            continue
+        if current and size + tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(span)
+        size += tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def fit_to_budget(content: str, max_tokens: int = FILE_TOKEN_BUDGET) -> str:
+    """Leading whole definitions of `content` that fit in max_tokens."""
+    if estimate_tokens(content) <= max_tokens:
+        return content
+    return chunk_source(content, max_tokens)[0]
+
+def cap_chunks(chunks: List[str], cap: int = REPO_TOKEN_CAP) -> List[str]:
+    """Keeps chunks in order until the running total would pass the cap."""
+    kept, total = [], 0
+    for chunk in chunks:
+        total += estimate_tokens(chunk)
+        if total > cap:
+            break
+        kept.append(chunk)
+    return kept
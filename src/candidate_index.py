@@ -0,0 +1,263 @@
+import os
+import json
+import glob
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_INDEX_PATH = 'candidates.sqlite'
+
+# Leaderboard sort keys -> candidates columns
+SORT_COLUMNS = {
+    'score': 'avg_score',
+    'best_score': 'best_score',
+    'stars': 'total_stars',
+    'recency': 'last_pushed',
+    'contribs': 'contribs',
+    'repos': 'repos_scored',
+}
+CANDIDATE_COLUMNS = (
+    'user_url', 'contribs', 'repos', 'repos_scored', 'avg_score', 'best_score',
+    'total_stars', 'last_pushed', 'location', 'website',
+)
+
+def to_timestamp(value: Union[None, float, int, str, datetime]) -> Optional[float]:
+    """
+    Epoch seconds from a datetime, an ISO-8601 string (GitHub's format) or a
+    number. Naive datetimes are UTC, as PyGithub returns them.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class CandidateIndex:
+    """
+    Scored candidates and repos in SQLite. Repos are the append/upsert unit;
+    each write refreshes the owning candidate's aggregate row (average and
+    best score, stars, last push, language shares), and every leaderboard
+    filter and sort key is an indexed column of those aggregates.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS repos (
+                repo_url TEXT PRIMARY KEY,
+                user_url TEXT NOT NULL,
+                name TEXT,
+                language TEXT,
+                stars INTEGER,
+                pushed_at REAL,
+                score REAL,
+                analysis_rate REAL,
+                prescreen_score REAL,
+                summary TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS repos_user ON repos (user_url);
+
+            CREATE TABLE IF NOT EXISTS candidates (
+                user_url TEXT PRIMARY KEY,
+                contribs INTEGER,
+                repos INTEGER NOT NULL DEFAULT 0,
+                repos_scored INTEGER NOT NULL DEFAULT 0,
+                avg_score REAL,
+                best_score REAL,
+                total_stars INTEGER NOT NULL DEFAULT 0,
+                last_pushed REAL,
+                location TEXT,
+                website TEXT
+            );
+            CREATE INDEX IF NOT EXISTS candidates_avg_score ON candidates (avg_score);
+            CREATE INDEX IF NOT EXISTS candidates_best_score ON candidates (best_score);
+            CREATE INDEX IF NOT EXISTS candidates_stars ON candidates (total_stars);
+            CREATE INDEX IF NOT EXISTS candidates_last_pushed ON candidates (last_pushed);
+            CREATE INDEX IF NOT EXISTS candidates_contribs ON candidates (contribs);
+            CREATE INDEX IF NOT EXISTS candidates_repos_scored ON candidates (repos_scored, avg_score);
+
+            -- Share of each candidate's repos whose primary language is `language`
+            CREATE TABLE IF NOT EXISTS candidate_languages (
+                user_url TEXT NOT NULL,
+                language TEXT NOT NULL,
+                share REAL NOT NULL,
+                PRIMARY KEY (user_url, language)
+            );
+            CREATE INDEX IF NOT EXISTS candidate_languages_share ON candidate_languages (language, share);
+        ''')
+        self._conn.commit()
+
+    def add_repos(self, rows: Iterable[Dict[str, Any]]):
+        """
+        Upserts repo rows (keys: repo_url, user_url and optionally name,
+        language, stars, pushed_at, score, analysis_rate, prescreen_score,
+        summary) in one transaction, then refreshes the affected candidates.
+        A score of None marks a repo that was seen but not scored; columns
+        left None never overwrite values already stored.
+        """
+        now = datetime.now().timestamp()
+        params = [
+            (row['repo_url'], row['user_url'], row.get('name'), row.get('language'), row.get('stars'),
+             to_timestamp(row.get('pushed_at')), row.get('score'), row.get('analysis_rate'),
+             row.get('prescreen_score'), row.get('summary'), now)
+            for row in rows
+        ]
+        if not params:
+            return
+        with self._lock, self._conn:
+            # A partial row (e.g. listing metadata without a score) keeps the columns it doesn't supply
+            self._conn.executemany('''
+                INSERT INTO repos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (repo_url) DO UPDATE SET
+                    user_url = excluded.user_url,
+                    name = COALESCE(excluded.name, name),
+                    language = COALESCE(excluded.language, language),
+                    stars = COALESCE(excluded.stars, stars),
+                    pushed_at = COALESCE(excluded.pushed_at, pushed_at),
+                    score = COALESCE(excluded.score, score),
+                    analysis_rate = COALESCE(excluded.analysis_rate, analysis_rate),
+                    prescreen_score = COALESCE(excluded.prescreen_score, prescreen_score),
+                    summary = COALESCE(excluded.summary, summary),
+                    updated = excluded.updated
+            ''', params)
+            self._refresh({p[1] for p in params})
+
+    def set_candidates(self, rows: Iterable[Dict[str, Any]]):
+        """Upserts candidate attributes that don't come from repos: contribs, location, website."""
+        params = [(row['user_url'], row.get('contribs'), row.get('location'), row.get('website')) for row in rows]
+        with self._lock, self._conn:
+            self._conn.executemany('''
+                INSERT INTO candidates (user_url, contribs, location, website) VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_url) DO UPDATE SET
+                    contribs = COALESCE(excluded.contribs, contribs),
+                    location = COALESCE(excluded.location, location),
+                    website = COALESCE(excluded.website, website)
+            ''', params)
+
+    def _refresh(self, user_urls):
+        conn = self._conn
+        for user_url in user_urls:
+            repos, scored, avg_score, best_score, stars, last_pushed = conn.execute('''
+                SELECT COUNT(*), COUNT(score), AVG(score), MAX(score), COALESCE(SUM(stars), 0), MAX(pushed_at)
+                FROM repos WHERE user_url = ?
+            ''', (user_url,)).fetchone()
+            conn.execute('''
+                INSERT INTO candidates (user_url, repos, repos_scored, avg_score, best_score, total_stars, last_pushed)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_url) DO UPDATE SET
+                    repos = excluded.repos, repos_scored = excluded.repos_scored,
+                    avg_score = excluded.avg_score, best_score = excluded.best_score,
+                    total_stars = excluded.total_stars, last_pushed = excluded.last_pushed
+            ''', (user_url, repos, scored, avg_score, best_score, stars, last_pushed))
+            conn.execute('DELETE FROM candidate_languages WHERE user_url = ?', (user_url,))
+            conn.execute('''
+                INSERT INTO candidate_languages
+                SELECT user_url, language, COUNT(*) * 1.0 / ? FROM repos
+                WHERE user_url = ? AND language IS NOT NULL GROUP BY language
+            ''', (repos, user_url))
+
+    def leaderboard(self, min_score: Optional[float] = None, min_repos: int = 1,
+                    language: Optional[str] = None, min_language_share: float = 0.0,
+                    min_stars: Optional[int] = None, max_stars: Optional[int] = None,
+                    pushed_after=None, min_contribs: Optional[int] = None,
+                    sort: str = 'score', descending: bool = True,
+                    limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Candidates with at least min_repos scored repos matching every given
+        filter, ordered by `sort` (one of SORT_COLUMNS). With a language, a
+        candidate qualifies when at least min_language_share of their repos
+        have it as primary language; the share is included in the rows.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        where, params = ['c.repos_scored >= ?'], [min_repos]
+        join, share_column = '', 'NULL'
+        if language:
+            join = 'JOIN candidate_languages l ON l.user_url = c.user_url AND l.language = ? AND l.share >= ?'
+            params = [language, min_language_share] + params
+            share_column = 'l.share'
+        for column, op, value in (
+            ('c.avg_score', '>=', min_score), ('c.total_stars', '>=', min_stars),
+            ('c.total_stars', '<=', max_stars), ('c.last_pushed', '>=', to_timestamp(pushed_after)),
+            ('c.contribs', '>=', min_contribs),
+        ):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                params.append(value)
+        order = f"c.{SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'} NULLS LAST, c.user_url"
+        query = f'''
+            SELECT {', '.join('c.' + column for column in CANDIDATE_COLUMNS)}, {share_column}
+            FROM candidates c {join}
+            WHERE {' AND '.join(where)}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        '''
+        with self._lock:
+            rows = self._conn.execute(query, params + [limit, offset]).fetchall()
+        return [dict(zip(CANDIDATE_COLUMNS + ('language_share',), row)) for row in rows]
+
+    def candidate_repos(self, user_url: str) -> List[Dict[str, Any]]:
+        columns = ('repo_url', 'name', 'language', 'stars', 'pushed_at', 'score', 'analysis_rate', 'prescreen_score', 'summary')
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM repos WHERE user_url = ? ORDER BY score DESC NULLS LAST", (user_url,)
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def ranking_rows(self) -> Tuple[List[Tuple[str, int]], List[Tuple[str, str, int, float, float, float]]]:
+        """
+        Everything ranking needs, read under one lock: (user_url, contribs)
+        per candidate and (user_url, language, stars, pushed_at, score,
+        analysis_rate) per repo, both ordered by user_url.
+        """
+        with self._lock:
+            candidates = self._conn.execute('SELECT user_url, contribs FROM candidates ORDER BY user_url').fetchall()
+            repos = self._conn.execute(
+                'SELECT user_url, language, stars, pushed_at, score, analysis_rate FROM repos ORDER BY user_url'
+            ).fetchall()
+        return candidates, repos
+
+    def import_results(self, users_dir: str = 'users') -> int:
+        """Loads existing users/*/repo_quality_scores.json files; returns the number of repos."""
+        rows = []
+        for path in glob.glob(os.path.join(users_dir, '*', 'repo_quality_scores.json')):
+            with open(path) as f:
+                results = json.load(f)
+            for repo_url, result in results.items():
+                rows.append({
+                    'repo_url': repo_url, 'user_url': result['user_url'], 'name': repo_url.rstrip('/').split('/')[-1],
+                    'score': result['average_score'] if result.get('analysis_rate') else None,
+                    'analysis_rate': result.get('analysis_rate'), 'prescreen_score': result.get('prescreen_score'),
+                    'summary': result.get('summary'),
+                })
+        self.add_repos(rows)
+        return len(rows)
+
+    def close(self):
+        self._conn.close()
+
+@lru_cache(maxsize=None)
+def get_candidate_index() -> Optional[CandidateIndex]:
+    """Process-wide index; set CANDIDATE_INDEX_PATH to an empty string to disable."""
+    # Read on first use, after config has loaded .env
+    path = os.getenv('CANDIDATE_INDEX_PATH', DEFAULT_INDEX_PATH)
+    return CandidateIndex(path) if path else None
+
+if __name__ == "__main__":
+    import sys
+    index = get_candidate_index()
+    if len(sys.argv) > 1 and sys.argv[1] == 'import':
+        print(f"Imported {index.import_results(*sys.argv[2:3])} repos")
+    for row in index.leaderboard(limit=20):
+        print(row)
@@ -1,8 +1,17 @@
+import os
+from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 from typing import List, Optional
 from datetime import datetime
 
+load_dotenv()
+
+# API endpoints; point these at harness.fake_server for offline runs and benchmarks
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+SCRAPINGBEE_URL = os.getenv('SCRAPINGBEE_URL', 'https://app.scrapingbee.com/api/v1/')
+GITHUB_WEB_URL = os.getenv('GITHUB_WEB_URL', 'https://github.com').rstrip('/')
+
 class Language(str, Enum):
     PYTHON = "Python"
     JAVASCRIPT = "JavaScript"
@@ -0,0 +1,134 @@
+import sys
+import math
+import hashlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from work_queue import REPO_FIELDS
+
+class SlimRepo:
+    """
+    The REPO_FIELDS of a GitHub repo JSON object (about 100 fields, nested
+    owner included) in slots. Readable like the dict it replaces:
+    repo['html_url'], repo.get('language').
+    """
+    __slots__ = REPO_FIELDS
+
+    def __init__(self, repo: Dict[str, Any]):
+        for field in REPO_FIELDS:
+            value = repo.get(field)
+            # Languages repeat across every repo of a crawl
+            setattr(self, field, sys.intern(value) if field == 'language' and value else value)
+
+    def __getitem__(self, field: str):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field: str, default=None):
+        return getattr(self, field, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in REPO_FIELDS}
+
+    def __repr__(self):
+        return f"SlimRepo({self.full_name!r})"
+
+def slim_repos(repos: Optional[Iterable[Dict[str, Any]]]) -> Optional[List[SlimRepo]]:
+    return [SlimRepo(repo) for repo in repos] if repos is not None else None
+
+class BloomFilter:
+    """
+    Approximate set of strings: never forgets a member, wrongly reports a
+    non-member with probability about error_rate while holding at most
+    capacity items. Costs ~1.44 * log2(1 / error_rate) bits per item.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Adds item; returns False if it was (or collides with) a member already."""
+        new = False
+        for p in self._positions(item):
+            if not self._bits[p >> 3] & (1 << (p & 7)):
+                self._bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        self.count += new
+        return new
+
+class CrawlState:
+    """
+    Profiles of one crawl under interned integer IDs: each URL is stored
+    once and the frontier holds ints. The visited set is the URL -> ID map,
+    or with bloom_error_rate a BloomFilter sized for `capacity` profiles,
+    in which case the map isn't kept and a false positive skips a profile.
+    """
+
+    def __init__(self, capacity: int = 0, bloom_error_rate: Optional[float] = None):
+        self._urls: List[str] = []
+        self._ids: Optional[Dict[str, int]] = None if bloom_error_rate else {}
+        self._bloom = BloomFilter(capacity, bloom_error_rate) if bloom_error_rate else None
+        self._contribs = array('q')
+        self._repos: List[Any] = []
+        self._crawled = 0
+
+    def visit(self, url: str, contribs: int = 0) -> Optional[int]:
+        """ID for a profile seen for the first time, None if already visited."""
+        if self._bloom is not None:
+            if not self._bloom.add(url):
+                return None
+        elif url in self._ids:
+            return None
+        else:
+            self._ids[url] = len(self._urls)
+        self._urls.append(url)
+        self._contribs.append(contribs)
+        self._repos.append(_PENDING)
+        return len(self._urls) - 1
+
+    def url(self, user_id: int) -> str:
+        return self._urls[user_id]
+
+    def contribs(self, user_id: int) -> int:
+        return self._contribs[user_id]
+
+    def repos(self, user_id: int) -> Optional[List[SlimRepo]]:
+        repos = self._repos[user_id]
+        return None if repos is _PENDING else repos
+
+    def set_repos(self, user_id: int, repos: Optional[Iterable[Dict[str, Any]]]):
+        self._crawled += self._repos[user_id] is _PENDING
+        self._repos[user_id] = slim_repos(repos)
+
+    def __len__(self):
+        """Number of profiles whose repos are known."""
+        return self._crawled
+
+    def profiles(self) -> Dict[str, Tuple[int, Optional[List[SlimRepo]]]]:
+        """Crawled profiles in do_dfs's {url: (contribs, repos)} shape, in crawl order."""
+        return {
+            self._urls[i]: (self._contribs[i], repos)
+            for i, repos in enumerate(self._repos) if repos is not _PENDING
+        }
+
+# Marks profiles that are queued but not crawled yet
+_PENDING = object()
@@ -0,0 +1,118 @@
+import os
+import time
+import socket
+import multiprocessing
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from work_queue import open_work_queue, DEFAULT_LEASE_SECONDS
+from crawl_state import slim_repos
+from tracing import span
+
+DEFAULT_QUEUE_URL = os.getenv('CRAWL_QUEUE_URL', 'sqlite:///crawl_queue.sqlite')
+# Profiles claimed per round trip to the queue
+CLAIM_BATCH = 1
+# Seconds to wait for other workers' leases before checking again
+IDLE_POLL = 0.1
+
+def load_keys(path: str = 'scraping_keys.txt') -> List[str]:
+    with open(path, 'r') as f:
+        return [key for key in f.read().splitlines() if key]
+
+def run_worker(queue_url: str, worker_id: str, scraping_keys: List[str],
+               lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+    """
+    Claims frontier profiles until the crawl is drained: lists each
+    profile's repos, pushes their contributors back onto the shared queue
+    and stores the profile's result. Returns the number of profiles done.
+    """
+    from loop import get_repos, get_contributors
+
+    queue = open_work_queue(queue_url)
+    keys = deque(scraping_keys)
+    done = 0
+    while True:
+        tasks = queue.claim(worker_id, CLAIM_BATCH, lease_seconds)
+        if not tasks:
+            if queue.is_drained():
+                break
+            time.sleep(IDLE_POLL)
+            continue
+        for task in tasks:
+            with span('crawl.expand', sample=True, profile=task.url, worker=worker_id):
+                repos = get_repos(task.url)
+                for repo in repos or []:
+                    # Once the shared candidate cap is reached, profiles are only listed
+                    if queue.is_full():
+                        break
+                    contributors = get_contributors(repo['contributors_url'], keys)
+                    queue.add(contributors, task.depth + 1)
+                if not queue.complete(worker_id, task.url, task.contribs, repos):
+                    print(f"[{worker_id}] lease on {task.url} lapsed, result dropped")
+                    continue
+            done += 1
+            print(f"[{worker_id}] done {task.url} ({len(repos or [])} repos)")
+    queue.close()
+    return done
+
+def _worker_process(queue_url: str, worker_id: str, keys: List[str], lease_seconds: float, workdir: Optional[str]):
+    if workdir:
+        os.chdir(workdir)
+    run_worker(queue_url, worker_id, keys, lease_seconds)
+
+def split_keys(keys: List[str], workers: int) -> List[List[str]]:
+    """Round-robin share of the scraping keys per worker; with fewer keys than workers, keys are shared."""
+    if len(keys) >= workers:
+        return [keys[i::workers] for i in range(workers)]
+    return [[keys[i % len(keys)]] for i in range(workers)] if keys else [[] for _ in range(workers)]
+
+def run_distributed_crawl(seed_github_link: str, num_candidates: int = 10, workers: int = 4,
+                          queue_url: str = DEFAULT_QUEUE_URL, keys_file: str = 'scraping_keys.txt',
+                          lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict[str, Tuple[int, Any]]:
+    """
+    Seeds the shared queue and runs `workers` local worker processes until
+    the crawl drains; workers on other hosts can join the same queue with
+    `python distributed_crawl.py work`. Returns the profiles in do_dfs's
+    {url: (contribs, repos)} shape.
+    """
+    queue = open_work_queue(queue_url)
+    queue.seed(seed_github_link, num_candidates)
+    host = socket.gethostname()
+    ctx = multiprocessing.get_context('spawn')
+    processes = [
+        ctx.Process(target=_worker_process, args=(queue_url, f"{host}-{os.getpid()}-{i}", keys, lease_seconds, os.getcwd()))
+        for i, keys in enumerate(split_keys(load_keys(keys_file), workers))
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    print(f"Crawl stats: {queue.stats()}")
+    results = {url: (contribs, slim_repos(repos)) for url, (contribs, repos) in queue.results().items()}
+    queue.close()
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Crawl GitHub contributors with workers sharing a lease-based queue")
+    parser.add_argument('mode', choices=['run', 'seed', 'work', 'stats'],
+                        help="run: seed and crawl with local workers; seed: only seed; work: join as one worker")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_URL)
+    parser.add_argument('--seed', default='https://github.com/Nottlespike')
+    parser.add_argument('--candidates', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--keys', default='scraping_keys.txt')
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument('--worker-id', default=None)
+    args = parser.parse_args()
+
+    if args.mode == 'run':
+        profiles = run_distributed_crawl(args.seed, args.candidates, args.workers, args.queue, args.keys, args.lease)
+        print(f"Crawled {len(profiles)} profiles")
+    elif args.mode == 'seed':
+        open_work_queue(args.queue).seed(args.seed, args.candidates)
+    elif args.mode == 'work':
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        print(f"{worker_id} completed {run_worker(args.queue, worker_id, load_keys(args.keys), args.lease)} profiles")
+    else:
+        print(open_work_queue(args.queue).stats())
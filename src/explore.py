@@ -1,21 +1,23 @@
 # return "starting point" repositories
 # this is for user's who don't have a target repository they have in mind 
-from dotenv import load_dotenv
-from config import SearchConfig, RepoConfig, Language, SortCriteria, SortOrder
-from datetime import datetime, timedelta
-from github import Github
-from github.NamedUser import NamedUser
-from github.PaginatedList import PaginatedList
-from github.Repository import Repository
+from __future__ import annotations
 
 import os
-load_dotenv()
-
+import logging
+from config import SearchConfig, RepoConfig, Language, SortCriteria, SortOrder
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
-from logging_setup import setup_logger
-
-logger = setup_logger()
+from typing import Dict, List, Any, TYPE_CHECKING
+from logging_setup import setup_logger, SkipLog
+from tracing import bind, traced
+
+if TYPE_CHECKING:
+    from github.NamedUser import NamedUser
+    from github.PaginatedList import PaginatedList
+    from github.Repository import Repository
+
+# Handlers are attached by setup_logger() in run_pipeline, not at import
+logger = logging.getLogger(__name__)
+skip_log = SkipLog(logger)
 github_token = os.getenv('GITHUB_TOKEN')
 
 class RepoAnalyzer:
@@ -26,15 +28,19 @@ class RepoAnalyzer:
         return {lang: (count / total) * 100 for lang, count in languages.items()}
 
     @staticmethod
-    def get_commit_history(repo, max_commits: int = 30) -> List[Dict[str, Any]]:
+    def get_commit_history(repo, max_commits: int = 30, with_files: bool = False) -> List[Dict[str, Any]]:
         commits = []
         for commit in repo.get_commits()[:max_commits]:
-            commits.append({
+            record = {
                 'sha': commit.sha,
                 'author': commit.author.login if commit.author else 'Unknown',
                 'date': commit.commit.author.date,
                 'message': commit.commit.message
-            })
+            }
+            if with_files:
+                # Costs a request per commit unless the listing already carried the files
+                record['files'] = [{'filename': f.filename, 'changes': f.changes} for f in commit.files]
+            commits.append(record)
         return commits
 
 def create_repo_dict(repo) -> Dict[str, Any]:
@@ -61,37 +67,37 @@ def meets_criteria(config: SearchConfig, repo) -> bool:
     analyzer = RepoAnalyzer()
     contributors = len(list(repo.get_contributors()))
     if contributors > config.repo_config.max_contributors:
-        logger.info(f"  ├─ {repo.name}: Skip - {contributors} contributors")
+        skip_log.skip(repo.name, 'contributors', f"{contributors} contributors")
         return False
 
     if repo.stargazers_count > config.repo_config.max_stars:
-        logger.info(f"  ├─ {repo.name}: Skip - {repo.stargazers_count} stars")
+        skip_log.skip(repo.name, 'stars', f"{repo.stargazers_count} stars")
         return False
 
     language_percentages = analyzer.get_language_percentages(repo)
     for lang in config.included_languages:
         if language_percentages.get(lang.value, 0) < config.repo_config.min_language_percentage:
-            logger.info(f"  ├─ {repo.name}: Skip - {language_percentages.get(lang.value, 0):.2f}% {lang.value}")
+            skip_log.skip(repo.name, 'language', f"{language_percentages.get(lang.value, 0):.2f}% {lang.value}")
             return False
 
     if config.min_repo_size and repo.size < config.min_repo_size:
-        logger.info(f"  ├─ {repo.name}: Skip - Too small")
+        skip_log.skip(repo.name, 'too small', "Too small")
         return False
 
     if config.max_repo_size and repo.size > config.max_repo_size:
-        logger.info(f"  ├─ {repo.name}: Skip - Too large")
+        skip_log.skip(repo.name, 'too large', "Too large")
         return False
 
     if not config.include_forks and repo.fork:
-        logger.info(f"  ├─ {repo.name}: Skip - Fork")
+        skip_log.skip(repo.name, 'fork', "Fork")
         return False
 
     if config.created_after and repo.created_at < config.created_after:
-        logger.info(f"  ├─ {repo.name}: Skip - Too old")
+        skip_log.skip(repo.name, 'too old', "Too old")
         return False
 
     if config.is_public is not None and repo.private != (not config.is_public):
-        logger.info(f"  ├─ {repo.name}: Skip - Wrong visibility")
+        skip_log.skip(repo.name, 'visibility', "Wrong visibility")
         return False
 
     return True
@@ -156,9 +162,11 @@ def print_repo_details(repo: Dict[str, Any]):
 
 # TODO user should be able to pass in
 # each of the fields below
+@traced('github.explore_repos')
 def explore_repos(limit=1) -> List[Dict]:
 # Create configuration
-    gh = Github(github_token)
+    from extractor.code_extractor import get_github
+    gh = get_github()
     search_config = SearchConfig(
         repo_config=RepoConfig(
             min_language_percentage=60.0,
@@ -199,6 +207,7 @@ def explore_repos(limit=1) -> List[Dict]:
         if len(repos) >= limit: 
             break
 
+    skip_log.flush()
     return repos
 
 def get_user_repo_query(config: SearchConfig, user_id: str) -> str:
@@ -249,6 +258,7 @@ def extract_contributors(repos):
     return ret
 
 # get all repos of user from html_url
+@traced('github.extract_rare_repos')
 def extract_rare_repos(contributors: List[NamedUser]):
     user_repos = dict()
     for contributor in contributors:
@@ -258,17 +268,98 @@ def extract_rare_repos(contributors: List[NamedUser]):
 
     return user_repos
 
-if __name__ == '__main__':
+# limit: repos scored per user; top_files_limit: files scored per repo
+# ranker: 'heuristic' or 'centrality' (import-graph PageRank)
+# prescreen_threshold: None for PRESCREEN_THRESHOLD, 0 to score everything
+# scoring_mode:
+#   'async': all of a user's repos concurrently under an adaptive limiter
+#   'packed': each repo's files bin-packed into as few requests as possible
+#   'threaded': one request per file on a thread pool
+#   'batch': everything deferred to message batches at the end of the run
+#   'sequential': a user's files in importance order, stopping once the user is
+#                 confidently above or below shortlist_threshold
+# offline: batch mode against LocalBatchServer instead of the provider
+# attribution: 'blame' or 'commits' to score only files the user mostly wrote
+#              (see analyzer.attribution, needs GITHUB_TOKEN), None (default) to score files by importance alone
+@traced('pipeline.run')
+def run_pipeline(limit=3, top_files_limit=3, ranker='heuristic', prescreen_threshold=None,
+                 scoring_mode='async', offline=False, seed_repos=1,
+                 dedup_index_path='dedup_index.json', shortlist_threshold=None,
+                 attribution=None) -> Dict[str, Any]:
     from concurrent.futures import ThreadPoolExecutor, as_completed
     from analyzer.repo_analyzer import analyze_repository
-    from analyzer.code_quality_analyzer import code_quality_analyze
+    from analyzer.code_quality_analyzer import code_quality_analyze, code_quality_analyze_packed
+    from analyzer.prescreen import prescreen_repository, PRESCREEN_THRESHOLD
+    from analyzer.dedup import NearDuplicateIndex
+    from analyzer.async_scoring import score_repos, AdaptiveLimiter
+    from analyzer.batch_scoring import score_repos_batch, AnthropicBatchBackend, LocalBatchServer
+    from analyzer.score_cache import get_score_cache
+    from analyzer.sequential import score_candidate_sequential, SHORTLIST_THRESHOLD
+    from analyzer.attribution import FileAttributor, get_authorship_cache, MAX_COMMITS
     from extractor.code_extractor import download_py_files
+    from candidate_index import get_candidate_index
     import json
 
-    limit = 3
-    top_files_limit = 3
+    setup_logger()
+    if prescreen_threshold is None:
+        prescreen_threshold = PRESCREEN_THRESHOLD
+    if shortlist_threshold is None:
+        shortlist_threshold = SHORTLIST_THRESHOLD
+
+    # Shared across every scanned repo (and run) so near-copies are scored once
+    dedup_index = (
+        NearDuplicateIndex.load(dedup_index_path)
+        if os.path.exists(dedup_index_path) else NearDuplicateIndex()
+    )
+    limiter = AdaptiveLimiter()
+    attributor = FileAttributor(attribution, cache=get_authorship_cache()) if attribution else None
+    usage = {}  # requests and tokens, incl. prompt-cache reads/writes
+    deferred = []
+    sequential_reports = {}
+    candidates = 0
+    index = get_candidate_index()
+    repo_meta = {}  # listing fields per repo url, for the candidate index
+
+    def save_results(user, user_dir, results, to_score, outcomes):
+        for repo, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                print(f'{repo} generated an exception: {outcome}')
+                continue
+            prescreen = to_score[repo][2]
+            avg_score, analysis_rate, summary = outcome
+            results[repo] = {
+                "average_score": avg_score,
+                "analysis_rate": analysis_rate,
+                "repo_url": repo,
+                'user_url' : user.html_url,
+                'summary': summary,
+                'prescreen_score': prescreen['score'],
+                'prescreen_metrics': prescreen['metrics'],
+            }
+            print(f"Repository {repo}:")
+            print(f"  Average score: {avg_score:.2f}")
+            print(f"  Analysis rate: {analysis_rate:.2f}%")
+            print(f"  Prescreen score: {prescreen['score']:.2f}")
+
+        with open(os.path.join(user_dir,'repo_quality_scores.json'), 'w') as f:
+            json.dump(results, f, indent=2)
 
-    init_repos = explore_repos(limit=1)
+        print("Analysis complete. Results saved to repo_quality_scores.json")
+        if index:
+            index.set_candidates([{'user_url': user.html_url, 'contribs': getattr(user, 'contributions', None)}])
+            index.add_repos([
+                dict(
+                    repo_meta.get(repo_url, {}), repo_url=repo_url, user_url=user.html_url,
+                    score=result['average_score'] if result['analysis_rate'] else None,
+                    analysis_rate=result['analysis_rate'], prescreen_score=result['prescreen_score'],
+                    summary=result['summary'],
+                )
+                for repo_url, result in results.items()
+            ])
+        nonlocal candidates
+        candidates += 1
+
+    init_repos = explore_repos(limit=seed_repos)
     user_repos: Dict[NamedUser, List[Repository]] = extract_rare_repos(extract_contributors(init_repos))
     for user,repos in user_repos.items():
         if not user.name:
@@ -279,57 +370,149 @@ if __name__ == '__main__':
             continue
         os.makedirs(user_dir, exist_ok=True)
 
+        results = {}
+        to_score = {}
+
         # download .py files
         for repo in repos[:limit]:
+            repo_meta[repo.html_url] = {
+                'name': repo.name, 'language': repo.language,
+                'stars': repo.stargazers_count, 'pushed_at': repo.pushed_at,
+            }
             repo_path = os.path.join(user_dir, repo.name)
             os.makedirs(repo_path, exist_ok=True)
             if repo.name[0] == '.': 
                 print('skipping', repo.name)
                 continue
             print(repo.name)
-            download_py_files(repo.id, repo_path)
-
-            top_files = analyze_repository(repo_path)[:top_files_limit]
+            clone_path = download_py_files(repo.id, repo_path)
+
+            if attributor:
+                # Rank everything, then keep the top files this user wrote
+                ranked = analyze_repository(repo_path, ranker=ranker, limit=None)
+                # Blame paths are relative to the downloaded tree's root
+                paths = [os.path.relpath(file, clone_path or repo_path) for file, _ in ranked]
+                authorship = attributor.authorship(
+                    repo.full_name, str(repo.pushed_at), paths, repo.default_branch,
+                    lambda: RepoAnalyzer.get_commit_history(repo, MAX_COMMITS, with_files=True)
+                )
+                top_files = attributor.select(ranked, paths, authorship, user.login, top_files_limit)
+            else:
+                top_files = [
+                    (file, importance, None)
+                    for file, importance in analyze_repository(repo_path, ranker=ranker, limit=top_files_limit)
+                ]
             print(f"Found {len(top_files)} important files in {repo.name}")
             importance_result = [
-                {"file": os.path.relpath(file, repo_path), "importance": importance}
-                for file, importance in top_files
+                {"file": os.path.relpath(file, repo_path), "importance": importance, "authorship": share}
+                for file, importance, share in top_files
             ]
 
             with open(os.path.join(repo_path, 'importance.json'), 'w') as f:
                 json.dump(importance_result, f, indent=2)
-            
-        results = {}
-       
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_repo = {
-                executor.submit(
-                    code_quality_analyze, 
-                    repo_path,
-                    importance_result
-                ): repo.html_url 
-                for repo in repos
-            }
-            
-            for future in as_completed(future_to_repo):
-                repo = future_to_repo[future]
-                try:
-                    avg_score, analysis_rate, summary = future.result()
-                    results[repo] = {
-                        "average_score": avg_score,
-                        "analysis_rate": analysis_rate,
-                        "repo_url": repo,
-                        'user_url' : user.html_url,
-                        'summary': summary
-                    }
-                    print(f"Repository {repo}:")
-                    print(f"  Average score: {avg_score:.2f}")
-                    print(f"  Analysis rate: {analysis_rate:.2f}%")
-                except Exception as exc:
-                    print(f'{repo} generated an exception: {exc}')
 
-        with open(os.path.join(user_dir,'repo_quality_scores.json'), 'w') as f:
-            json.dump(results, f, indent=2)
+            if attributor and not importance_result:
+                print(f"No important files in {repo.name} written by {user.login}, skipping")
+                results[repo.html_url] = {
+                    "average_score": 0,
+                    "analysis_rate": 0,
+                    "repo_url": repo.html_url,
+                    'user_url' : user.html_url,
+                    'summary': 'no files authored by the user, skipping',
+                    'prescreen_score': 0.0,
+                    'prescreen_metrics': {},
+                }
+                continue
 
-        print("Analysis complete. Results saved to repo_quality_scores.json")
+            # Local static prescreen: drop low-signal repos before any LLM call
+            prescreen = prescreen_repository(repo_path, importance_result)
+            if prescreen['score'] < prescreen_threshold:
+                print(f"Prescreen {prescreen['score']:.2f} below {prescreen_threshold}, skipping {repo.name}")
+                results[repo.html_url] = {
+                    "average_score": 0,
+                    "analysis_rate": 0,
+                    "repo_url": repo.html_url,
+                    'user_url' : user.html_url,
+                    'summary': 'prescreen below threshold, skipping',
+                    'prescreen_score': prescreen['score'],
+                    'prescreen_metrics': prescreen['metrics'],
+                }
+                continue
+            to_score[repo.html_url] = (repo_path, importance_result, prescreen)
+       
+        if scoring_mode == 'batch':
+            deferred.append((user, user_dir, results, to_score))
+            continue
+        elif scoring_mode == 'async':
+            outcomes = score_repos(
+                {repo_url: (repo_path, importance_result) for repo_url, (repo_path, importance_result, _) in to_score.items()},
+                dedup_index,
+                limiter
+            )
+        elif scoring_mode == 'sequential':
+            # Most promising repos first, by local prescreen score
+            ordered = sorted(to_score.items(), key=lambda item: -item[1][2]['score'])
+            outcomes, sequential_reports[user.html_url] = score_candidate_sequential(
+                {repo_url: (repo_path, importance_result) for repo_url, (repo_path, importance_result, _) in ordered},
+                dedup_index,
+                usage,
+                threshold=shortlist_threshold
+            )
+        else:
+            analyze = code_quality_analyze_packed if scoring_mode == 'packed' else code_quality_analyze
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                future_to_repo = {
+                    executor.submit(
+                        bind(analyze), 
+                        repo_path,
+                        importance_result,
+                        dedup_index,
+                        usage=usage
+                    ): repo_url
+                    for repo_url, (repo_path, importance_result, _) in to_score.items()
+                }
+                outcomes = {}
+                for future in as_completed(future_to_repo):
+                    try:
+                        outcomes[future_to_repo[future]] = future.result()
+                    except Exception as exc:
+                        outcomes[future_to_repo[future]] = exc
+
+        save_results(user, user_dir, results, to_score, outcomes)
+        dedup_index.save(dedup_index_path)
+
+    if deferred:
+        outcomes = score_repos_batch(
+            {
+                repo_url: (repo_path, importance_result)
+                for _, _, _, to_score in deferred
+                for repo_url, (repo_path, importance_result, _) in to_score.items()
+            },
+            backend=LocalBatchServer() if offline else AnthropicBatchBackend(),
+            poll_interval=1 if offline else 30,
+            usage=usage,
+            dedup_index=dedup_index
+        )
+        for user, user_dir, results, to_score in deferred:
+            save_results(user, user_dir, results, to_score, {repo_url: outcomes[repo_url] for repo_url in to_score})
+        dedup_index.save(dedup_index_path)
+
+    if scoring_mode == 'async':
+        usage = limiter.stats()['usage']
+    print(f"LLM usage: {usage}")
+    if attributor:
+        print(f"Attribution: {attributor.stats()}")
+    if sequential_reports:
+        scored = sum(r['files_scored'] for r in sequential_reports.values())
+        total = sum(r['files_total'] for r in sequential_reports.values())
+        print(f"Sequential scoring: {scored}/{total} files scored, "
+              f"{sum(r['decision'] == 'above' for r in sequential_reports.values())}/{len(sequential_reports)} shortlisted")
+    if get_score_cache():
+        print(f"LLM cache: {get_score_cache().stats()}")
+    return {
+        'candidates': candidates, 'usage': usage, 'sequential': sequential_reports,
+        'attribution': attributor.stats() if attributor else None,
+    }
 
+if __name__ == '__main__':
+    run_pipeline()
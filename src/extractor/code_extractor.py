@@ -1,14 +1,15 @@
 import os
 import re
-import requests
-from github import Github, GithubException
-from dotenv import load_dotenv
+from functools import lru_cache
 
-# Load environment variables
-load_dotenv()
+from config import GITHUB_API_URL
+from tracing import traced
 
-# Initialize GitHub client
-g = Github(os.getenv('GITHUB_TOKEN'))
+@lru_cache(maxsize=None)
+def get_github():
+    # Built on first use; config has already loaded .env
+    from github import Github
+    return Github(os.getenv('GITHUB_TOKEN'), base_url=GITHUB_API_URL)
 
 def parse_repo_results(file_path):
     repos = []
@@ -19,10 +20,13 @@ def parse_repo_results(file_path):
         repos = [match for match in matches]
     return repos
 
+@traced('extract.download_py_files', sample=True)
 def download_py_files(repo_name, output_dir, max_files=30):
+    """Downloads the repo's .py files under output_dir/<repo name>; returns that directory, or None on error."""
+    from github import GithubException
     try:
         # Get the repository
-        repo = g.get_repo(repo_name)
+        repo = get_github().get_repo(repo_name)
         # Create a directory for the repository
         repo_dir = os.path.join(output_dir, repo.name)
         os.makedirs(repo_dir, exist_ok=True)
@@ -44,9 +48,11 @@ def download_py_files(repo_name, output_dir, max_files=30):
                     f.write(file_content.decoded_content)
                 print(f"Downloaded: {file_path}")
                 down += 1
+        return repo_dir
     
     except GithubException as e:
         print(f"Error accessing repository {repo_name}: {e}")
+        return None
 
 def main():
     # Path to the results file
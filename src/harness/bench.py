@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import multiprocessing
+from typing import Dict, Any, Optional
+
+from harness.fake_server import HarnessServer, FakeWorld
+
+def _run_loop(num_candidates: int, seed_user: str) -> Dict[str, Any]:
+    from loop import fetch_candidates_and_scores
+    scores = fetch_candidates_and_scores(f"https://github.com/{seed_user}", num_candidates)
+    return {'candidates': len(scores['scores'])}
+
+def _run_explore(num_candidates: int, seed_user: str) -> Dict[str, Any]:
+    from explore import run_pipeline
+    return run_pipeline(seed_repos=max(1, num_candidates // 3))
+
+PIPELINES = {
+    'loop': _run_loop,
+    'explore': _run_explore,
+}
+
+def _child(pipeline: str, env: Dict[str, str], workdir: str, num_candidates: int, seed_user: str,
+           quiet: bool, results):
+    # Runs in a fresh interpreter so imports, clients and peak RSS are per pipeline
+    if quiet:
+        sys.stdout = sys.stderr = open(os.devnull, 'w')
+    os.environ.update(env)
+    os.chdir(workdir)
+    with open('scraping_keys.txt', 'w') as f:
+        f.write('bench-key\n')
+    started = time.perf_counter()
+    outcome = PIPELINES[pipeline](num_candidates, seed_user)
+    results.put({
+        'candidates': outcome['candidates'],
+        'seconds': time.perf_counter() - started,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+def run_benchmark(pipeline: str, server: HarnessServer, num_candidates: int = 10,
+                  seed_user: str = 'user0', quiet: bool = True, trace: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs one pipeline in a child process against the harness server and
+    reports candidates per minute, requests and LLM tokens per candidate,
+    and the child's peak RSS. With `trace`, the child also writes a Chrome
+    trace of the run to that path.
+    """
+    env = dict(server.env())
+    env.update({
+        'GITHUB_TOKEN': 'bench', 'GH_API_KEY': 'bench', 'ANTHROPIC_API_KEY': 'bench',
+        # Measure real work, not cache hits from a previous run
+        'LLM_CACHE_PATH': '',
+    })
+    if trace:
+        env['TRACE_FILE'] = os.path.abspath(trace)
+    before = server.stats()
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        child = ctx.Process(target=_child, args=(pipeline, env, workdir, num_candidates, seed_user, quiet, results))
+        child.start()
+        outcome = results.get()
+        child.join()
+    after = server.stats()
+
+    requests = sum(after['requests'].values()) - sum(before['requests'].values())
+    tokens = sum(
+        after['tokens'].get(k, 0) - before['tokens'].get(k, 0)
+        for k in ('input_tokens', 'output_tokens')
+    )
+    candidates = max(outcome['candidates'], 1)
+    return {
+        'pipeline': pipeline,
+        'candidates': outcome['candidates'],
+        'seconds': round(outcome['seconds'], 3),
+        'candidates_per_minute': round(outcome['candidates'] / outcome['seconds'] * 60, 2),
+        'requests_per_candidate': round(requests / candidates, 2),
+        'tokens_per_candidate': round(tokens / candidates, 1),
+        'requests_by_route': {
+            route: count - before['requests'].get(route, 0) for route, count in after['requests'].items()
+        },
+        'peak_rss_mb': round(outcome['peak_rss_mb'], 1),
+    }
+
+def main(argv: Optional[list] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the crawl and scoring pipelines offline")
+    parser.add_argument('--pipeline', choices=sorted(PIPELINES) + ['all'], default='all')
+    parser.add_argument('--mode', choices=['fake', 'replay', 'record'], default='fake')
+    parser.add_argument('--fixtures', default=None, help="fixture directory for record/replay")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every replayed response")
+    parser.add_argument('--candidates', type=int, default=10)
+    parser.add_argument('--users', type=int, default=50, help="size of the synthetic world")
+    parser.add_argument('--seed-user', default='user0')
+    parser.add_argument('--trace', default=None, help="write a Chrome trace per pipeline to <trace>.<pipeline>.json")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    pipelines = sorted(PIPELINES) if args.pipeline == 'all' else [args.pipeline]
+    server = HarnessServer(args.mode, args.fixtures, args.latency, world=FakeWorld(num_users=args.users))
+    with server:
+        for pipeline in pipelines:
+            trace = f"{args.trace}.{pipeline}.json" if args.trace else None
+            report = run_benchmark(pipeline, server, args.candidates, args.seed_user, quiet=not args.verbose, trace=trace)
+            print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import resource
+import subprocess
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Field layout of a GitHub /users/{login}/repos item: ~80 fields plus the owner object
+OWNER_TEMPLATE = {
+    'login': '{login}', 'id': 0, 'node_id': 'MDQ6VXNlcjA=', 'avatar_url': 'https://avatars.githubusercontent.com/u/0?v=4',
+    'gravatar_id': '', 'url': 'https://api.github.com/users/{login}', 'html_url': 'https://github.com/{login}',
+    'followers_url': 'https://api.github.com/users/{login}/followers',
+    'following_url': 'https://api.github.com/users/{login}/following{/other_user}',
+    'gists_url': 'https://api.github.com/users/{login}/gists{/gist_id}',
+    'starred_url': 'https://api.github.com/users/{login}/starred{/owner}{/repo}',
+    'subscriptions_url': 'https://api.github.com/users/{login}/subscriptions',
+    'organizations_url': 'https://api.github.com/users/{login}/orgs',
+    'repos_url': 'https://api.github.com/users/{login}/repos',
+    'events_url': 'https://api.github.com/users/{login}/events{/privacy}',
+    'received_events_url': 'https://api.github.com/users/{login}/received_events',
+    'type': 'User', 'site_admin': False,
+}
+REPO_URL_FIELDS = (
+    'forks', 'keys', 'collaborators', 'teams', 'hooks', 'issue_events', 'events', 'assignees', 'branches',
+    'tags', 'blobs', 'git_tags', 'git_refs', 'trees', 'statuses', 'languages', 'stargazers', 'contributors',
+    'subscribers', 'subscription', 'commits', 'git_commits', 'comments', 'issue_comment', 'contents',
+    'compare', 'merges', 'archive', 'downloads', 'issues', 'pulls', 'milestones', 'notifications',
+    'labels', 'releases', 'deployments',
+)
+
+def repo_json(login: str, name: str, i: int) -> Dict[str, Any]:
+    full_name = f"{login}/{name}"
+    api = f"https://api.github.com/repos/{full_name}"
+    repo = {
+        'id': i, 'node_id': f"R_kgDO{i:08d}", 'name': name, 'full_name': full_name, 'private': False,
+        'owner': {k: v.replace('{login}', login) if isinstance(v, str) else v for k, v in OWNER_TEMPLATE.items()},
+        'html_url': f"https://github.com/{full_name}", 'description': f"Description of {name} " * 3,
+        'fork': False, 'url': api,
+        'created_at': '2021-03-04T05:06:07Z', 'updated_at': '2024-05-06T07:08:09Z', 'pushed_at': '2024-05-06T07:08:09Z',
+        'git_url': f"git://github.com/{full_name}.git", 'ssh_url': f"git@github.com:{full_name}.git",
+        'clone_url': f"https://github.com/{full_name}.git", 'svn_url': f"https://github.com/{full_name}",
+        'homepage': None, 'size': 1000 + i % 5000, 'stargazers_count': i % 97, 'watchers_count': i % 97,
+        'language': 'Python', 'has_issues': True, 'has_projects': True, 'has_downloads': True, 'has_wiki': True,
+        'has_pages': False, 'has_discussions': False, 'forks_count': i % 13, 'mirror_url': None, 'archived': False,
+        'disabled': False, 'open_issues_count': i % 7, 'license': None, 'allow_forking': True, 'is_template': False,
+        'web_commit_signoff_required': False, 'topics': ['python', 'machine-learning'], 'visibility': 'public',
+        'forks': i % 13, 'open_issues': i % 7, 'watchers': i % 97, 'default_branch': 'main',
+    }
+    for field in REPO_URL_FIELDS:
+        repo[f"{field}_url"] = f"{api}/{field}"
+    return repo
+
+def _profile_page(user: int, repos_per_profile: int) -> List[Dict[str, Any]]:
+    # Through json.loads, like get_repos, so every profile gets its own objects
+    login = f"user{user}"
+    return json.loads(json.dumps([repo_json(login, f"project{j}", user * 100 + j) for j in range(repos_per_profile)]))
+
+def crawl(variant: str, profiles: int, repos_per_profile: int, contributors_per_repo: int,
+          error_rate: float) -> Dict[str, Any]:
+    """
+    Walks a synthetic crawl of `profiles` profiles through one variant of
+    the crawl structures, visiting contributors_per_repo contributor URLs
+    per repo. Returns the peak RSS and how fast it grew.
+    """
+    from crawl_state import CrawlState
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    # Contributors are drawn from a universe twice the crawl, so about half are repeats
+    universe = profiles * 2
+
+    def contributors(user: int):
+        return (f"https://github.com/user{(user * 7 + c) % universe}" for c in range(repos_per_profile * contributors_per_repo))
+
+    if variant == 'legacy':
+        # do_dfs before: URL set and queue, full repo JSON per profile
+        seed = 'https://github.com/user0'
+        queue, added, all_profiles = deque([(seed, 0)]), {seed}, {}
+        while queue:
+            url, contribs = queue.popleft()
+            user = int(url.rsplit('user', 1)[1])
+            all_profiles[url] = (contribs, _profile_page(user, repos_per_profile))
+            for contributor in contributors(user):
+                if len(added) > profiles:
+                    break
+                if contributor not in added:
+                    added.add(contributor)
+                    queue.append((contributor, user % 50))
+        kept = len(all_profiles)
+    else:
+        state = CrawlState(profiles + 1, error_rate if variant == 'bloom' else None)
+        queue = deque([state.visit('https://github.com/user0')])
+        visited = 1
+        while queue:
+            user_id = queue.popleft()
+            user = int(state.url(user_id).rsplit('user', 1)[1])
+            state.set_repos(user_id, _profile_page(user, repos_per_profile))
+            for contributor in contributors(user):
+                if visited > profiles:
+                    break
+                new_id = state.visit(contributor, user % 50)
+                if new_id is not None:
+                    queue.append(new_id)
+                    visited += 1
+        kept = len(state)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'variant': variant,
+        'profiles': kept,
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': round(peak / 1024, 1),
+        'rss_growth_mb_per_10k': round((peak - baseline) / 1024 / profiles * 10000, 1),
+    }
+
+def run(variant: str, profiles: int, repos_per_profile: int, contributors_per_repo: int, error_rate: float):
+    # Fresh interpreter per variant, so peak RSS belongs to that variant alone
+    code = (
+        "import json; from harness.crawl_memory import crawl; "
+        f"print(json.dumps(crawl({variant!r}, {profiles}, {repos_per_profile}, {contributors_per_repo}, {error_rate})))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv: Optional[list] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Peak RSS of crawl state: full repo JSON vs compact records")
+    parser.add_argument('--profiles', type=int, default=10000)
+    parser.add_argument('--repos', type=int, default=30, help="repos per profile (one page of /users/{login}/repos)")
+    parser.add_argument('--contributors', type=int, default=3, help="contributor URLs visited per repo")
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    parser.add_argument('--variants', nargs='+', default=['legacy', 'compact', 'bloom'])
+    args = parser.parse_args(argv)
+    for variant in args.variants:
+        print(json.dumps(run(variant, args.profiles, args.repos, args.contributors, args.error_rate)))
+
+if __name__ == "__main__":
+    main()
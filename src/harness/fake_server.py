@@ -0,0 +1,477 @@
+import os
+import re
+import json
+import time
+import base64
+import random
+import hashlib
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode, quote, unquote
+from typing import Dict, List, Any, Optional, Tuple
+
+GITHUB_UPSTREAM = 'https://api.github.com'
+GITHUB_WEB_UPSTREAM = 'https://github.com'
+ANTHROPIC_UPSTREAM = 'https://api.anthropic.com'
+SCRAPINGBEE_UPSTREAM = 'https://app.scrapingbee.com'
+
+# Stored fixtures refer to the server through this placeholder so they
+# replay on whatever port the server gets next time
+BASE_PLACEHOLDER = '{{BASE_URL}}'
+# Never written to fixtures: query parameters and headers carrying credentials
+SECRET_PARAMS = ('api_key',)
+SECRET_HEADERS = ('authorization', 'x-api-key')
+
+FILE_TEMPLATE = '''import os
+from typing import List
+
+
+class {cls}:
+    """Handles {topic} for the {repo} project."""
+
+    def __init__(self, items: List[str]):
+        self.items = items
+
+    def run(self) -> int:
+        total = 0
+        for item in self.items:
+            if item.startswith("{prefix}"):
+                total += len(item)
+            elif item:
+                total += {weight}
+        return total
+
+
+def {func}(path: str) -> List[str]:
+    """Reads {topic} entries from path."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+'''
+
+TOPICS = ['parsing', 'caching', 'training', 'plotting', 'scheduling', 'routing', 'indexing']
+
+class FakeWorld:
+    """
+    Deterministic synthetic GitHub: users with Python repos, each repo with
+    a few source files and a small set of contributors drawn from the other
+    users, so crawls from any user keep finding new profiles.
+    """
+
+    def __init__(self, num_users: int = 50, repos_per_user: int = 3, files_per_repo: int = 4, seed: int = 0):
+        rng = random.Random(seed)
+        self.users = [f"user{i}" for i in range(num_users)]
+        self.repos = {}
+        for i, login in enumerate(self.users):
+            for j in range(repos_per_user):
+                others = rng.sample([u for u in self.users if u != login], k=min(2, num_users - 1))
+                files = {}
+                for k in range(files_per_repo):
+                    path = 'main.py' if k == 0 else f"pkg/module{k}.py"
+                    files[path] = FILE_TEMPLATE.format(
+                        cls=f"Worker{i}x{j}x{k}", topic=rng.choice(TOPICS), repo=f"project{j}",
+                        prefix=rng.choice('abcdef'), weight=rng.randint(1, 9), func=f"load_{k}_{j}",
+                    )
+                self.repos[f"{login}/project{j}"] = {
+                    'id': i * 1000 + j + 1,
+                    'owner': login,
+                    'name': f"project{j}",
+                    'stars': rng.randint(0, 80),
+                    'contributors': [(login, rng.randint(20, 200))] + [(u, rng.randint(1, 20)) for u in others],
+                    'files': files,
+                }
+        self.by_id = {repo['id']: full for full, repo in self.repos.items()}
+
+    def user_json(self, base: str, login: str, contributions: Optional[int] = None) -> Dict[str, Any]:
+        index = self.users.index(login)
+        data = {
+            'login': login, 'id': 100 + index, 'type': 'User', 'name': f"User {index}",
+            'html_url': f"https://github.com/{login}",
+            'url': f"{base}/users/{login}",
+            'repos_url': f"{base}/users/{login}/repos",
+            'location': 'Earth', 'blog': f"https://{login}.example.com",
+        }
+        if contributions is not None:
+            data['contributions'] = contributions
+        return data
+
+    def profile_html(self, login: str) -> str:
+        # Mirrors the vcard markup of a real profile page, padded to a realistic size
+        index = self.users.index(login)
+        padding = '<div class="Box"><span>filler</span></div>' * 3000
+        return (
+            f'<html><head><title>{login}</title><script>var x = {index};</script></head><body>{padding}'
+            '<ul class="vcard-details">'
+            '<li itemprop="homeLocation"><svg class="octicon octicon-location"></svg><span>Earth</span></li>'
+            f'<li itemprop="url"><svg class="octicon octicon-link"></svg><a href="https://{login}.example.com">site</a></li>'
+            f'<li itemprop="social"><a href="https://twitter.com/{login}">@{login}</a></li>'
+            f'</ul>{padding}</body></html>'
+        )
+
+    def repo_json(self, base: str, full_name: str) -> Dict[str, Any]:
+        repo = self.repos[full_name]
+        stamp = '2024-06-01T12:00:00Z'
+        return {
+            'id': repo['id'], 'name': repo['name'], 'full_name': full_name,
+            'owner': self.user_json(base, repo['owner']),
+            'html_url': f"https://github.com/{full_name}",
+            'url': f"{base}/repos/{full_name}",
+            'contributors_url': f"{base}/repos/{full_name}/contributors",
+            'private': False, 'fork': False, 'language': 'Python',
+            'stargazers_count': repo['stars'], 'watchers_count': repo['stars'], 'forks_count': 0,
+            'size': sum(len(c) for c in repo['files'].values()) // 1024 + 1,
+            'default_branch': 'main', 'topics': ['machine-learning'],
+            'created_at': stamp, 'updated_at': stamp, 'pushed_at': stamp,
+        }
+
+    def contents_json(self, base: str, full_name: str, path: str):
+        files = self.repos[full_name]['files']
+        url = f"{base}/repos/{full_name}/contents"
+        if path in files:
+            content = files[path].encode()
+            return {
+                'type': 'file', 'name': path.rsplit('/', 1)[-1], 'path': path, 'size': len(content),
+                'sha': hashlib.sha1(content).hexdigest(), 'url': f"{url}/{path}",
+                'encoding': 'base64', 'content': base64.b64encode(content).decode(),
+            }
+        prefix = f"{path}/" if path else ''
+        entries = {}
+        for file_path in files:
+            if not file_path.startswith(prefix):
+                continue
+            head, _, rest = file_path[len(prefix):].partition('/')
+            entry_path = prefix + head
+            entries[entry_path] = {
+                'type': 'dir' if rest else 'file', 'name': head, 'path': entry_path,
+                'sha': hashlib.sha1(entry_path.encode()).hexdigest(),
+                'size': 0 if rest else len(files[file_path]), 'url': f"{url}/{entry_path}",
+            }
+        return list(entries.values()) if entries else None
+
+    def github(self, base: str, method: str, path: str, query: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        if method == 'POST' and path == '/graphql':
+            return 200, self.graphql(json.loads(body or b'{}').get('query', ''))
+
+        parts = [unquote(p) for p in path.strip('/').split('/')]
+        if parts[:1] == ['users'] and len(parts) >= 2 and parts[1] in self.users:
+            login = parts[1]
+            if len(parts) == 2:
+                return 200, self.user_json(base, login)
+            if parts[2:] == ['repos']:
+                return 200, [self.repo_json(base, full) for full, r in self.repos.items() if r['owner'] == login]
+        if parts[:1] == ['repositories'] and len(parts) == 2 and parts[1].isdigit() and int(parts[1]) in self.by_id:
+            return 200, self.repo_json(base, self.by_id[int(parts[1])])
+        if parts[:1] == ['repos'] and len(parts) >= 3:
+            full_name = f"{parts[1]}/{parts[2]}"
+            if full_name in self.repos:
+                rest = parts[3:]
+                repo = self.repos[full_name]
+                if not rest:
+                    return 200, self.repo_json(base, full_name)
+                if rest == ['contributors']:
+                    return 200, [self.user_json(base, u, c) for u, c in repo['contributors']]
+                if rest == ['languages']:
+                    return 200, {'Python': sum(len(c) for c in repo['files'].values())}
+                if rest == ['topics']:
+                    return 200, {'names': ['machine-learning']}
+                if rest == ['commits']:
+                    return 200, self.commits_json(base, full_name)
+                if rest[:1] == ['contents']:
+                    contents = self.contents_json(base, full_name, '/'.join(rest[1:]))
+                    if contents is not None:
+                        return 200, contents
+        if parts == ['search', 'repositories']:
+            items = [self.repo_json(base, full) for full in list(self.repos)[:30]]
+            return 200, {'total_count': len(items), 'incomplete_results': False, 'items': items}
+        return 404, {'message': 'Not Found'}
+
+    def commits_json(self, base: str, full_name: str) -> List[Dict[str, Any]]:
+        repo = self.repos[full_name]
+        commits = []
+        for n, (path, _) in enumerate(repo['files'].items()):
+            login = repo['contributors'][n % len(repo['contributors'])][0]
+            sha = hashlib.sha1(f"{full_name}{path}".encode()).hexdigest()
+            commits.append({
+                'sha': sha, 'url': f"{base}/repos/{full_name}/commits/{sha}",
+                'author': self.user_json(base, login),
+                'commit': {
+                    'message': f"Add {path}",
+                    'author': {'name': login, 'email': f"{login}@example.com", 'date': '2024-06-01T12:00:00Z'},
+                },
+                'files': [{'filename': path, 'additions': 10, 'deletions': 0, 'changes': 10}],
+            })
+        return commits
+
+    def blame_json(self, full_name: str, query: str) -> Dict[str, Any]:
+        # Each file is wholly written by the author of its commit in commits_json
+        repo = self.repos[full_name]
+        paths = list(repo['files'])
+        blames = {}
+        for alias, path in re.findall(r'(\w+):\s*blame\(path:\s*"([^"]+)"\)', query):
+            if path not in repo['files']:
+                blames[alias] = None
+                continue
+            login = repo['contributors'][paths.index(path) % len(repo['contributors'])][0]
+            blames[alias] = {'ranges': [{
+                'startingLine': 1, 'endingLine': repo['files'][path].count('\n') + 1,
+                'commit': {'author': {'user': {'login': login}}},
+            }]}
+        return {'data': {'repository': {'object': blames}}}
+
+    def graphql(self, query: str) -> Dict[str, Any]:
+        repo = re.search(r'repository\(owner:\s*"([^"]+)",\s*name:\s*"([^"]+)"\)', query)
+        if repo and 'blame(' in query and f"{repo.group(1)}/{repo.group(2)}" in self.repos:
+            return self.blame_json(f"{repo.group(1)}/{repo.group(2)}", query)
+        match = re.search(r'login:\s*"([^"]+)"', query)
+        if match and match.group(1) in self.users:
+            login = match.group(1)
+            nodes = [
+                {'name': r['name'], 'url': f"https://github.com/{full}", 'stargazerCount': r['stars'],
+                 'primaryLanguage': {'name': 'Python'}}
+                for full, r in self.repos.items() if r['owner'] == login
+            ]
+            return {'data': {'user': {'login': login, 'repositories': {'nodes': nodes}}}}
+        return {'data': {'viewer': {'login': 'fake'}}}
+
+def fake_message(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic Messages API reply shaped after what each prompt asks for."""
+    system_blocks = request.get('system') or []
+    if isinstance(system_blocks, str):
+        system_blocks = [{'type': 'text', 'text': system_blocks}]
+    system = ''.join(block.get('text', '') for block in system_blocks)
+    prompt = ''.join(
+        m['content'] if isinstance(m['content'], str) else ''.join(b.get('text', '') for b in m['content'])
+        for m in request.get('messages', [])
+    )
+    digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+
+    if "'files'" in system:
+        names = re.findall(r'^### File: (.+)$', prompt, re.MULTILINE)
+        text = json.dumps({
+            'files': [{'file': name, 'score': (digest >> i) % 10 + 1} for i, name in enumerate(names)],
+            'summary': f"Stub summary of {len(names)} files.",
+        })
+    elif "'score'" in system or "'score'" in prompt:
+        text = json.dumps({'score': digest % 10 + 1})
+    else:
+        text = f"Stub summary of {len(prompt)} characters of code."
+
+    return {
+        'id': f"msg_fake_{digest % 10 ** 12}", 'type': 'message', 'role': 'assistant',
+        'model': request.get('model', 'fake'), 'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn', 'stop_sequence': None,
+        'usage': {
+            # No prompt caching: the scoring requests never set a cache breakpoint
+            'input_tokens': (len(system) + len(prompt)) // 4,
+            'output_tokens': len(text) // 4,
+        },
+    }
+
+def route_of(path: str) -> str:
+    if path.startswith('/v1/messages'):
+        return 'messages'
+    if path.startswith('/api/v1'):
+        return 'scrapingbee'
+    if path == '/graphql':
+        return 'graphql'
+    if path.startswith('/web/'):
+        return 'web'
+    return 'rest'
+
+class HarnessServer:
+    """
+    Local stand-in for GitHub REST/GraphQL, ScrapingBee and the Anthropic
+    Messages API, in one of three modes:
+
+    - 'fake': answers from a synthetic FakeWorld
+    - 'record': proxies to the real services and stores every exchange
+      under fixture_dir
+    - 'replay': serves stored fixtures (falling back to the FakeWorld on a
+      miss when fallback=True)
+
+    Every response is delayed by `latency` seconds except in record mode.
+    Point GITHUB_API_URL, SCRAPINGBEE_URL and ANTHROPIC_BASE_URL at
+    env()'s values to route the pipelines through it.
+    """
+
+    def __init__(self, mode: str = 'fake', fixture_dir: Optional[str] = None, latency: float = 0.0,
+                 world: Optional[FakeWorld] = None, port: int = 0, fallback: bool = True):
+        if mode not in ('fake', 'record', 'replay'):
+            raise ValueError(f"Unknown mode {mode!r}")
+        if mode != 'fake' and not fixture_dir:
+            raise ValueError(f"{mode} mode needs a fixture_dir")
+        self.mode = mode
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.world = world or FakeWorld()
+        self.fallback = fallback
+        self.requests = Counter()
+        self.tokens = Counter()
+        self._lock = threading.Lock()
+        if fixture_dir:
+            os.makedirs(fixture_dir, exist_ok=True)
+
+        harness = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, headers, payload = harness.handle(self.command, self.path, dict(self.headers), body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self) -> 'HarnessServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self) -> Dict[str, str]:
+        return {
+            'GITHUB_API_URL': self.url,
+            'GITHUB_WEB_URL': f"{self.url}/web",
+            'SCRAPINGBEE_URL': f"{self.url}/api/v1/",
+            'ANTHROPIC_BASE_URL': self.url,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'requests': dict(self.requests), 'tokens': dict(self.tokens)}
+
+    def _fixture_key(self, method: str, path: str, body: bytes) -> str:
+        split = urlsplit(path)
+        # Keys must not depend on the server address or on credentials
+        query = sorted(
+            (k, v.replace(self.url, BASE_PLACEHOLDER).replace(GITHUB_UPSTREAM, BASE_PLACEHOLDER))
+            for k, v in parse_qsl(split.query) if k not in SECRET_PARAMS
+        )
+        raw = f"{method} {split.path}?{urlencode(query)}".encode() + b'\0' + body
+        return hashlib.sha256(raw).hexdigest()[:24]
+
+    @staticmethod
+    def _scrub_path(path: str) -> str:
+        split = urlsplit(path)
+        query = [(k, v) for k, v in parse_qsl(split.query, keep_blank_values=True) if k not in SECRET_PARAMS]
+        return split._replace(query=urlencode(query)).geturl()
+
+    def _upstream(self, method, path, headers, body):
+        route = route_of(path)
+        if route == 'messages':
+            target = ANTHROPIC_UPSTREAM + path
+        elif route == 'web':
+            target = GITHUB_WEB_UPSTREAM + path[len('/web'):]
+        elif route == 'scrapingbee':
+            target = SCRAPINGBEE_UPSTREAM + path.replace(quote(self.url, safe=''), quote(GITHUB_UPSTREAM, safe=''))
+        else:
+            target = GITHUB_UPSTREAM + path
+        forward = {k: v for k, v in headers.items() if k.lower() not in ('host', 'content-length', 'accept-encoding')}
+        request = urllib.request.Request(target, data=body or None, headers=forward, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    def handle(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        route = route_of(path)
+        key = self._fixture_key(method, path, body)
+        fixture_path = os.path.join(self.fixture_dir, f"{key}.json") if self.fixture_dir else None
+
+        if self.mode == 'record':
+            status, upstream_headers, payload = self._upstream(method, path, headers, body)
+            text = payload.decode('utf-8', errors='replace').replace(GITHUB_UPSTREAM, BASE_PLACEHOLDER)
+            kept = {
+                k: v for k, v in upstream_headers.items()
+                if k.lower() in ('content-type', 'link', 'retry-after') and k.lower() not in SECRET_HEADERS
+            }
+            with open(fixture_path, 'w') as f:
+                json.dump({'method': method, 'path': self._scrub_path(path), 'status': status, 'headers': kept, 'body': text}, f)
+            response = (status, kept, text.replace(BASE_PLACEHOLDER, self.url).encode())
+        else:
+            time.sleep(self.latency)
+            response = None
+            if self.mode == 'replay' and os.path.exists(fixture_path):
+                with open(fixture_path) as f:
+                    fixture = json.load(f)
+                response = (fixture['status'], fixture['headers'], fixture['body'].replace(BASE_PLACEHOLDER, self.url).encode())
+            elif self.mode == 'fake' or self.fallback:
+                response = self._fake(method, path, body)
+            else:
+                response = (404, {'Content-Type': 'application/json'}, b'{"message": "no fixture"}')
+
+        with self._lock:
+            self.requests[route] += 1
+            if route == 'messages' and response[0] == 200:
+                try:
+                    usage = json.loads(response[2]).get('usage', {})
+                    for field, value in usage.items():
+                        self.tokens[field] += value or 0
+                except (ValueError, AttributeError):
+                    pass
+        return response
+
+    def _fake(self, method: str, path: str, body: bytes):
+        split = urlsplit(path)
+        query = dict(parse_qsl(split.query))
+        route = route_of(split.path)
+        if route == 'messages':
+            data = fake_message(json.loads(body or b'{}'))
+            status = 200
+        elif route == 'web':
+            login = unquote(split.path[len('/web/'):].strip('/'))
+            if login in self.world.users:
+                return 200, {'Content-Type': 'text/html; charset=utf-8'}, self.world.profile_html(login).encode()
+            return 404, {'Content-Type': 'text/html'}, b'<h1>Not Found</h1>'
+        elif route == 'scrapingbee':
+            target = urlsplit(query.get('url', ''))
+            status, data = self.world.github(self.url, 'GET', target.path, dict(parse_qsl(target.query)), b'')
+        else:
+            status, data = self.world.github(self.url, method, split.path, query, body)
+        return status, {'Content-Type': 'application/json'}, json.dumps(data).encode()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local fake / record / replay server for GitHub and Anthropic")
+    parser.add_argument('--mode', default='fake', choices=['fake', 'record', 'replay'])
+    parser.add_argument('--fixtures', default=None)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = HarnessServer(args.mode, args.fixtures, args.latency, port=args.port)
+    for key, value in server.env().items():
+        print(f"export {key}={value}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
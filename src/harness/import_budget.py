@@ -0,0 +1,63 @@
+import os
+import re
+import sys
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module: (cold import budget in ms, heavy packages it must not pull in)
+BUDGETS = {
+    'server': (450, ('anthropic', 'github', 'bs4', 'requests')),
+    'explore': (250, ('anthropic', 'github', 'bs4', 'requests')),
+    'analyzer.code_quality_analyzer': (150, ('anthropic',)),
+    'extractor.code_extractor': (250, ('github', 'requests')),
+}
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def import_profile(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Imports `module` in a fresh interpreter under -X importtime, with the API
+    keys unset so the import can't depend on them. Returns (total ms,
+    {top-level package: cumulative us}).
+    """
+    env = {k: v for k, v in os.environ.items() if k not in ('ANTHROPIC_API_KEY', 'GITHUB_TOKEN', 'GH_API_KEY')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    packages, total = {}, 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        packages[name.split('.')[0]] = max(packages.get(name.split('.')[0], 0), cumulative)
+        if name == module:
+            total = cumulative
+    return total / 1000, packages
+
+def check(modules: Optional[List[str]] = None, runs: int = 3) -> bool:
+    ok = True
+    for module in modules or BUDGETS:
+        budget_ms, forbidden = BUDGETS.get(module, (None, ()))
+        # Best of several runs; the first can include cold disk cache
+        profiles = [import_profile(module) for _ in range(runs)]
+        total_ms, packages = min(profiles, key=lambda p: p[0])
+        heaviest = sorted(
+            ((us, name) for name, us in packages.items() if name != module.split('.')[0]), reverse=True
+        )[:5]
+        pulled = [name for name in forbidden if name in packages]
+        within = budget_ms is None or total_ms <= budget_ms
+        status = 'ok' if within and not pulled else 'FAIL'
+        ok = ok and status == 'ok'
+        print(f"{status:4} import {module}: {total_ms:.1f} ms (budget {budget_ms} ms)")
+        print(f"     heaviest: {', '.join(f'{name} {us / 1000:.1f} ms' for us, name in heaviest)}")
+        if pulled:
+            print(f"     imports deferred packages at import time: {', '.join(pulled)}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check(sys.argv[1:] or None) else 1)
@@ -0,0 +1,40 @@
+import sys
+import asyncio
+import time
+
+from analyzer.async_scoring import AdaptiveLimiter
+
+async def _congestion_event(limiter: AdaptiveLimiter, in_flight: int):
+    # in_flight requests admitted together, all refused with a 429
+    started = asyncio.Event()
+    issued = []
+
+    async def request():
+        async with limiter:
+            issued.append(time.monotonic())
+            if len(issued) == in_flight:
+                started.set()
+            await started.wait()
+
+    await asyncio.gather(*(request() for _ in range(in_flight)))
+    for issued_at in issued:
+        limiter.on_rate_limit(issued_at=issued_at)
+
+def check(initial: int = 32, in_flight: int = 16) -> bool:
+    """
+    AIMD sanity check: in_flight simultaneous 429s halve the limit once, and
+    a 429 from a request issued after that decrease halves it again.
+    """
+    limiter = AdaptiveLimiter(initial=initial, maximum=initial)
+    asyncio.run(_congestion_event(limiter, in_flight))
+    after_event = limiter.limit
+    asyncio.run(_congestion_event(limiter, 1))
+    after_next = limiter.limit
+
+    ok = after_event == initial / 2 and after_next == initial / 4
+    print(f"{'ok' if ok else 'FAIL':4} {in_flight} simultaneous 429s: limit {initial} -> {after_event} "
+          f"(expected {initial / 2}); next event -> {after_next} (expected {initial / 4})")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import colorlog
+
+from logging_setup import setup_logger, shutdown_logging, SkipLog
+
+# Shape of one crawled repo in explore.py: a burst of skip lines from
+# meets_criteria followed by print_repo_details for the repo that passes
+SKIPS_PER_REPO = 20
+DETAIL_LINES = 14
+
+def legacy_setup(log_file):
+    # The original setup_logger: synchronous handlers on the root logger
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    console_handler = colorlog.StreamHandler()
+    console_handler.setFormatter(colorlog.ColoredFormatter("%(log_color)s%(asctime)s - %(message)s", datefmt="%H:%M:%S"))
+    logger.addHandler(console_handler)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(file_handler)
+    return logger
+
+def crawl_repo(logger, skip_log, n):
+    for i in range(SKIPS_PER_REPO):
+        name = f"repo{n}-{i}"
+        if skip_log:
+            skip_log.skip(name, 'contributors', "40 contributors")
+        else:
+            logger.info(f"  ├─ {name}: Skip - 40 contributors")
+    for line in range(DETAIL_LINES):
+        logger.info(f"  detail {line} for repo{n}")
+
+def measure(logger, skip_log, repos, workers):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda n: crawl_repo(logger, skip_log, n), range(repos)))
+    if skip_log:
+        skip_log.flush()
+    return (time.perf_counter() - started) / repos * 1e6
+
+def main(repos=2000, workers=4):
+    stderr = sys.stderr
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        # Console output goes to /dev/null; the file handler still writes for real
+        sys.stderr = devnull
+        try:
+            logger = legacy_setup(os.path.join(tmp, 'legacy.log'))
+            results['before'] = measure(logger, None, repos, workers)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+
+            logger = setup_logger(os.path.join(tmp, 'queued.log'))
+            setup_logger(os.path.join(tmp, 'queued.log'))  # must not add handlers again
+            results['handlers_after_two_setups'] = len(logger.handlers)
+            results['after'] = measure(logger, SkipLog(logger), repos, workers)
+            shutdown_logging()
+        finally:
+            sys.stderr = stderr
+    print(f"Logging cost per crawled repo ({repos} repos, {workers} threads):")
+    print(f"  before (sync handlers, every skip logged): {results['before']:.1f} us")
+    print(f"  after (queue listener, rate-limited skips): {results['after']:.1f} us")
+    print(f"  root handlers after two setup_logger() calls: {results['handlers_after_two_setups']}")
+
+if __name__ == "__main__":
+    main()
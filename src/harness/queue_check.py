@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+from work_queue import SQLiteWorkQueue
+
+def _crawl(queue: SQLiteWorkQueue, seed: str, max_profiles: int) -> dict:
+    # One worker expanding every profile into two fresh contributors
+    queue.seed(seed, max_profiles)
+    while not queue.is_drained():
+        for task in queue.claim('check', limit=4):
+            queue.add(((f"{task.url}/{i}", 1) for i in range(2)), task.depth + 1)
+            queue.complete('check', task.url, task.contribs, [])
+    return queue.results()
+
+def check(max_profiles: int = 5) -> bool:
+    """
+    Re-run check on one persistent queue file: a second crawl, from a new
+    seed or the same one, starts over instead of returning the first
+    crawl's profiles.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'crawl_queue.sqlite')
+    first = _crawl(SQLiteWorkQueue(path), 'https://github.com/a', max_profiles)
+    second = _crawl(SQLiteWorkQueue(path), 'https://github.com/b', max_profiles)
+    again = _crawl(SQLiteWorkQueue(path), 'https://github.com/b', max_profiles)
+
+    expected = max_profiles + 1
+    ok = (
+        len(first) == len(second) == len(again) == expected
+        and all(url.startswith('https://github.com/b') for url in second)
+    )
+    print(f"{'ok' if ok else 'FAIL':4} re-seeded queue: {len(first)} profiles from a, "
+          f"{len(second)} from b, {len(again)} on re-running b (expected {expected} each, b's own)")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
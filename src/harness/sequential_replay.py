@@ -0,0 +1,144 @@
+import os
+import json
+import random
+from typing import Dict, List, Optional
+
+from analyzer.sequential import replay, SHORTLIST_THRESHOLD, CONFIDENCE, MIN_FILES, WAVE_SIZE
+
+# {user: {repo: file scores in importance order}}, repos in scoring order
+Corpus = Dict[str, Dict[str, List[float]]]
+
+def load_corpus(users_dir: str = 'users') -> Corpus:
+    """
+    Rebuilds per-file scores of a finished explore run from its users/
+    directory and the LLM cache: every file listed in a repo's
+    importance.json whose score is cached. No LLM calls are made, so score
+    the run exhaustively (any scoring_mode but 'sequential') with the cache on.
+    """
+    from analyzer.code_quality_analyzer import MODEL, TEMPERATURE, SCORE_PROMPT_VERSION
+    from analyzer.score_cache import get_score_cache
+    from analyzer.token_budget import fit_to_budget, FILE_TOKEN_BUDGET
+
+    cache = get_score_cache()
+    if cache is None:
+        raise RuntimeError("Replaying a run needs the LLM cache; LLM_CACHE_PATH is empty")
+    corpus = {}
+    for user in sorted(os.listdir(users_dir)):
+        user_dir = os.path.join(users_dir, user)
+        prescreen = {}
+        results_path = os.path.join(user_dir, 'repo_quality_scores.json')
+        if os.path.exists(results_path):
+            with open(results_path) as f:
+                prescreen = {
+                    url.rstrip('/').split('/')[-1]: result.get('prescreen_score') or 0
+                    for url, result in json.load(f).items()
+                }
+        repos = {}
+        for repo in sorted(os.listdir(user_dir), key=lambda name: -prescreen.get(name, 0)):
+            importance_path = os.path.join(user_dir, repo, 'importance.json')
+            if not os.path.exists(importance_path):
+                continue
+            with open(importance_path) as f:
+                files = json.load(f)
+            scores = []
+            for file_info in files:
+                path = os.path.join(user_dir, repo, file_info['file'])
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = fit_to_budget(f.read(), FILE_TOKEN_BUDGET)
+                score = cache.get('score', content, SCORE_PROMPT_VERSION, MODEL, TEMPERATURE)
+                if score is not None:
+                    scores.append(score)
+            if scores:
+                repos[repo] = scores
+        if repos:
+            corpus[user] = repos
+    return corpus
+
+def synthetic_corpus(users: int = 500, repos: int = 3, files: int = 5, seed: int = 0) -> Corpus:
+    """Users with a latent skill, repos varying around it and noisy integer file scores."""
+    rng = random.Random(seed)
+    corpus = {}
+    for u in range(users):
+        skill = rng.gauss(6.5, 1.3)
+        corpus[f"user{u}"] = {}
+        for r in range(rng.randint(1, repos)):
+            repo_skill = skill + rng.gauss(0, 0.7)
+            corpus[f"user{u}"][f"repo{r}"] = [
+                min(10, max(1, round(rng.gauss(repo_skill, 1.2)))) for _ in range(rng.randint(1, files))
+            ]
+    return corpus
+
+def _ranks(values: List[float]) -> List[float]:
+    # Average ranks for ties, as Spearman's rho needs
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2
+        i = j + 1
+    return ranks
+
+def spearman(a: List[float], b: List[float]) -> float:
+    ra, rb = _ranks(a), _ranks(b)
+    mean = (len(a) - 1) / 2
+    cov = sum((x - mean) * (y - mean) for x, y in zip(ra, rb))
+    var_a = sum((x - mean) ** 2 for x in ra)
+    var_b = sum((y - mean) ** 2 for y in rb)
+    return cov / (var_a * var_b) ** 0.5 if var_a and var_b else 1.0
+
+def evaluate(corpus: Corpus, threshold: float = SHORTLIST_THRESHOLD, confidence: float = CONFIDENCE,
+             min_files: int = MIN_FILES, wave_size: int = WAVE_SIZE, top_k: int = 50) -> Dict[str, float]:
+    """Sequential against exhaustive scoring of the same corpus: LLM calls saved and ranking agreement."""
+    exhaustive, sequential = [], []
+    calls = total = agree = both = exhaustive_above = sequential_above = 0
+    for repos in corpus.values():
+        scores = [score for files in repos.values() for score in files]
+        estimate, used, decision = replay(repos, threshold, confidence, min_files, wave_size)
+        full_mean = sum(scores) / len(scores)
+        exhaustive.append(full_mean)
+        sequential.append(estimate.mean)
+        calls += used
+        total += len(scores)
+        truly_above = full_mean > threshold
+        agree += (decision == 'above') == truly_above
+        exhaustive_above += truly_above
+        sequential_above += decision == 'above'
+        both += truly_above and decision == 'above'
+    top_exhaustive = set(sorted(range(len(exhaustive)), key=lambda i: -exhaustive[i])[:top_k])
+    top_sequential = set(sorted(range(len(sequential)), key=lambda i: -sequential[i])[:top_k])
+    return {
+        'candidates': len(corpus),
+        'llm_calls': calls,
+        'llm_calls_exhaustive': total,
+        'calls_saved_pct': round((1 - calls / total) * 100, 1) if total else 0.0,
+        'verdict_agreement': round(agree / len(corpus), 4) if corpus else 1.0,
+        'shortlist_precision': round(both / sequential_above, 4) if sequential_above else 1.0,
+        'shortlist_recall': round(both / exhaustive_above, 4) if exhaustive_above else 1.0,
+        'spearman': round(spearman(exhaustive, sequential), 4),
+        f'top_{top_k}_overlap': round(len(top_exhaustive & top_sequential) / max(len(top_exhaustive), 1), 4),
+    }
+
+def main(argv: Optional[list] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay scored candidates through the sequential stopping rule")
+    parser.add_argument('--users-dir', default=None, help="users/ directory of an exhaustively scored run")
+    parser.add_argument('--synthetic', type=int, default=1000, help="synthetic candidates when no --users-dir")
+    parser.add_argument('--threshold', type=float, default=SHORTLIST_THRESHOLD)
+    parser.add_argument('--confidence', type=float, nargs='+', default=[0.8, CONFIDENCE, 0.95, 0.99])
+    parser.add_argument('--min-files', type=int, default=MIN_FILES)
+    parser.add_argument('--wave-size', type=int, default=WAVE_SIZE)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.users_dir) if args.users_dir else synthetic_corpus(args.synthetic)
+    for confidence in args.confidence:
+        report = evaluate(corpus, args.threshold, confidence, args.min_files, args.wave_size)
+        print(json.dumps(dict(confidence=confidence, **report)))
+
+if __name__ == "__main__":
+    main()
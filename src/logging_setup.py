@@ -1,30 +1,121 @@
+import os
+import json
+import queue
+import atexit
 import logging
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
 import colorlog
 
-def setup_logger():
+LOG_FILE = os.getenv('LOG_FILE', 'repo_finder.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+# One JSON object per line in the log file instead of plain text
+LOG_JSON = os.getenv('LOG_JSON', '0') == '1'
+
+_listener = None
+_setup_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+def setup_logger(log_file=LOG_FILE, json_output=LOG_JSON):
+    """
+    Configures the root logger once per process and returns it; later
+    calls are no-ops. Records go through a queue so callers never block on
+    console or file I/O; a listener thread writes them to the console and
+    a rotating log file.
+    """
+    global _listener
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-
-    formatter = colorlog.ColoredFormatter(
-        "%(log_color)s%(asctime)s - %(message)s",
-        datefmt="%H:%M:%S",
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'red,bg_white',
-        },
-        secondary_log_colors={},
-        style='%'
-    )
-
-    console_handler = colorlog.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    file_handler = logging.FileHandler("repo_finder.log")
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-    logger.addHandler(file_handler)
-
-    return logger
\ No newline at end of file
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+        logger.setLevel(logging.INFO)
+
+        formatter = colorlog.ColoredFormatter(
+            "%(log_color)s%(asctime)s - %(message)s",
+            datefmt="%H:%M:%S",
+            log_colors={
+                'DEBUG': 'cyan',
+                'INFO': 'green',
+                'WARNING': 'yellow',
+                'ERROR': 'red',
+                'CRITICAL': 'red,bg_white',
+            },
+            secondary_log_colors={},
+            style='%'
+        )
+
+        console_handler = colorlog.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+
+        if log_file:
+            file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+            file_handler.setFormatter(
+                JsonFormatter() if json_output else logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+            )
+            handlers.append(file_handler)
+
+        _listener = QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+        logger.addHandler(QueueHandler(_listener.queue))
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    return logger
+
+def shutdown_logging():
+    """Drains queued records and stops the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        for handler in list(logging.getLogger().handlers):
+            if isinstance(handler, QueueHandler) and handler.queue is _listener.queue:
+                logging.getLogger().removeHandler(handler)
+        _listener = None
+
+class SkipLog:
+    """
+    Rate-limited log of filtered-out items. The first `per_reason` skips of
+    each reason are logged as they happen; the rest are only counted and
+    reported by flush().
+    """
+
+    def __init__(self, logger, per_reason=5):
+        self.logger = logger
+        self.per_reason = per_reason
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def skip(self, name, reason, detail=None):
+        with self._lock:
+            self.counts[reason] += 1
+            count = self.counts[reason]
+        if count <= self.per_reason:
+            self.logger.info(f"  ├─ {name}: Skip - {detail or reason}")
+        elif count == self.per_reason + 1:
+            self.logger.info(f"  ├─ further '{reason}' skips counted, not logged")
+
+    def flush(self):
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        if counts:
+            summary = ', '.join(f"{reason}: {n}" for reason, n in counts.most_common())
+            self.logger.info(f"Skipped {sum(counts.values())} repos ({summary})")
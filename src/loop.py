@@ -1,8 +1,5 @@
-from bs4 import BeautifulSoup
-
 from functools import cache
 import queue
-import requests
 import re
 import subprocess
 import json
@@ -11,12 +8,20 @@ import random
 import time
 from typing import Union, List, Optional, Tuple, Dict, Any
 
-from dotenv import load_dotenv
 from collections import deque
 
-load_dotenv()
+from config import GITHUB_API_URL, SCRAPINGBEE_URL
+from scrape import enrich_profiles
+from candidate_index import get_candidate_index
+from crawl_state import CrawlState
+from tracing import span, traced
+
+# False-positive rate of a Bloom-filter visited set for very large crawls;
+# unset keeps the exact one
+VISITED_BLOOM_ERROR_RATE = float(os.getenv('CRAWL_BLOOM_ERROR_RATE', '0')) or None
 
 # The curl command
+@traced('github.get_repos')
 def get_repos(profile_url: str) -> List[str]:
     """
     Performs web scraping on GitHub repositories and contributors starting from a root profile URL,
@@ -26,7 +31,7 @@ def get_repos(profile_url: str) -> List[str]:
     curl_command = [
         'curl',
         '-H', f"Authorization: {os.getenv('GH_API_KEY')}",
-        f'https://api.github.com/users/{username}/repos'
+        f'{GITHUB_API_URL}/users/{username}/repos'
     ]
     print(f"{curl_command=}")
     try:
@@ -36,9 +41,8 @@ def get_repos(profile_url: str) -> List[str]:
         with open('repositories.json', 'w') as f:
             f.write(result.stdout)
 
-        # Parse the JSON file
-        with open('repositories.json', 'r') as f:
-            repositories = json.load(f)
+        # Parse the output itself: concurrent crawl workers share the file
+        repositories = json.loads(result.stdout)
 
         # Now you can work with the parsed JSON data
         result_repos = []
@@ -65,17 +69,19 @@ def rotate_key(all_scraping_keys) -> Optional[str]:
     return all_scraping_keys[0] if all_scraping_keys else None
 
 
+@traced('github.get_contributors')
 def get_contributors(url: str, all_scraping_keys: deque, initial_delay=1, max_delay=60) -> List[Tuple[str, int]]:
     """
     Retrieves a list of contributors for a given URL using multiple API
     keys with error handling for rate limiting and key exhaustion.
     """
+    import requests
     delay = initial_delay
     while all_scraping_keys:
         current_key = all_scraping_keys[0]
         try:
             response = requests.get(
-                url='https://app.scrapingbee.com/api/v1/',
+                url=SCRAPINGBEE_URL,
                 params={
                     'api_key': current_key,
                     'url': url,
@@ -112,12 +118,13 @@ def get_contributors(url: str, all_scraping_keys: deque, initial_delay=1, max_de
     return []  # This line will be reached if we exit the while loop (i.e., all keys are exhausted)
 
 
-def do_dfs(all_scraping_keys: deque, seed_github_link: str, num_candidates: int) -> Dict[str, Tuple[int, Any]]:
-    # Init BFS
+@traced('crawl.do_dfs')
+def do_dfs(all_scraping_keys: deque, seed_github_link: str, num_candidates: int,
+           bloom_error_rate: Optional[float] = VISITED_BLOOM_ERROR_RATE) -> Dict[str, Tuple[int, Any]]:
+    # Init BFS; the queue and visited set hold interned profile IDs, not URLs
+    state = CrawlState(num_candidates + 1, bloom_error_rate)
     q = queue.Queue()
-    q.put((seed_github_link, 0))
-    added = set([seed_github_link])   # prevent cycles
-    all_profiles = dict()
+    q.put(state.visit(seed_github_link))
     num_profiles = 0
 
     def process_repos_for_profile():
@@ -128,31 +135,34 @@ def do_dfs(all_scraping_keys: deque, seed_github_link: str, num_candidates: int)
             contributors = get_contributors(repo['contributors_url'], all_scraping_keys)
             print(f"repo {repo['full_name']}, got {len(contributors)} contributors")
             for profile_url, contribs in contributors:
-                if profile_url not in added:
-                    q.put((profile_url, contribs))
-                    added.add(profile_url)
+                user_id = state.visit(profile_url, contribs)  # None if seen: prevents cycles
+                if user_id is not None:
+                    q.put(user_id)
                     num_profiles += 1
                     if num_profiles >= num_candidates:
                         return  # stop adding new contributors to queue
 
     # DFS on the q starting from seed_github_link
     while not q.empty():
-        profile_url, num_contribs_to_orig_addition_repo = q.get()
-        repos = get_repos(profile_url)
+        user_id = q.get()
+        profile_url = state.url(user_id)
+        with span('crawl.expand', sample=True, profile=profile_url) as s:
+            # Only the REPO_FIELDS of each repo are kept
+            state.set_repos(user_id, get_repos(profile_url))
+            repos = state.repos(user_id)
+            print(f"added {profile_url}, now {len(state)} profiles")
 
-        # Add profile stats
-        all_profiles[profile_url] = (num_contribs_to_orig_addition_repo, repos)
-        print(f"added {profile_url}, now {len(all_profiles)} profiles")
+            if num_profiles >= num_candidates:
+                continue  # stop adding new contributors to queue
 
-        if num_profiles >= num_candidates:
-            continue  # stop adding new contributors to queue
+            process_repos_for_profile()
+            s.set(queued=q.qsize())
 
-        process_repos_for_profile()
-
-    return all_profiles
+    return state.profiles()
 
 
-def run_bfs_scraping(seed_github_link: str, num_candidates: int=10) -> Dict[str, Tuple[int, Any]]:
+def run_bfs_scraping(seed_github_link: str, num_candidates: int=10,
+                     bloom_error_rate: Optional[float] = VISITED_BLOOM_ERROR_RATE) -> Dict[str, Tuple[int, Any]]:
     """
     Performs BFS on GitHub repositories to retrieve contributors' profiles and their contributions,
     using scraping keys and limiting the number of contributors fetched.
@@ -162,7 +172,7 @@ def run_bfs_scraping(seed_github_link: str, num_candidates: int=10) -> Dict[str,
         all_scraping_keys = deque(f.read().splitlines())  # Use deque for efficient rotation
     print("Available keys:", all_scraping_keys)
 
-    all_profiles = do_dfs(all_scraping_keys, seed_github_link, num_candidates)
+    all_profiles = do_dfs(all_scraping_keys, seed_github_link, num_candidates, bloom_error_rate)
 
     with open('contributors.txt', 'w') as f:
         for profile_url, (contribs, repos) in all_profiles.items():
@@ -178,7 +188,7 @@ def calculate_repo_score(github_repo_url: str):
 
 
 @cache
-def fetch_candidates_and_scores(seed_github_link: str, num_candidates: int=10) -> Dict[str, Tuple[int, Any]]:
+def fetch_candidates_and_scores(seed_github_link: str, num_candidates: int=10, enrich: bool=True) -> Dict[str, Tuple[int, Any]]:
     # Run BFS scraping to get contributors and their repos
     all_profiles = run_bfs_scraping(seed_github_link, num_candidates)
 
@@ -191,7 +201,31 @@ def fetch_candidates_and_scores(seed_github_link: str, num_candidates: int=10) -
             repo_scores[repo['full_name']] = repo_summary
         scores[profile_url] = repo_scores
 
-    return {"scores": scores}
+    # Location, website and socials scraped from each profile page
+    profiles = enrich_profiles(all_profiles) if enrich else {}
+
+    index = get_candidate_index()
+    if index:
+        index.set_candidates([
+            dict(profiles.get(profile_url, {}), user_url=profile_url, contribs=contribs)
+            for profile_url, (contribs, _) in all_profiles.items()
+        ])
+        # Listing metadata only: calculate_repo_score is a placeholder, not an LLM score
+        index.add_repos([
+            {
+                'repo_url': repo['html_url'], 'user_url': profile_url, 'name': repo['name'],
+                'language': repo.get('language'), 'stars': repo.get('stargazers_count'),
+                'pushed_at': repo.get('pushed_at'), 'score': None,
+            }
+            for profile_url, (_, repos) in all_profiles.items()
+            for repo in repos or []
+        ])
+
+    from ranking import pool_from_crawl
+    # No scores: calculate_repo_score is a placeholder (and hash()-seeded per process)
+    ranking = pool_from_crawl(all_profiles).top_k(k=num_candidates)
+
+    return {"scores": scores, "profiles": profiles, "ranking": ranking}
 
 
 if __name__ == "__main__":
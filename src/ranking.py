@@ -0,0 +1,243 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from candidate_index import to_timestamp
+
+# Repo-level features, each scaled to [0, 1] before weighting
+FEATURES = ('llm_score', 'analysis_rate', 'stars', 'size', 'recency', 'language_share')
+DEFAULT_WEIGHTS = {
+    'llm_score': 0.55,
+    'analysis_rate': 0.05,
+    'stars': 0.1,
+    'size': 0.05,
+    'recency': 0.1,
+    'language_share': 0.05,
+    # Candidate-level: contributions to the repo they were found through
+    'contribs': 0.1,
+}
+# Days for the recency feature to halve
+RECENCY_HALF_LIFE = 180
+# Pseudo-repos of pool-average quality mixed into every candidate, so a
+# single lucky repo can't outrank a consistent record
+PRIOR_STRENGTH = 2.0
+
+class CandidatePool:
+    """
+    Candidates and their repos as dense arrays, ready to be re-ranked under
+    any weights without touching the crawl or the LLM. Repos are stored
+    grouped by candidate so per-candidate sums are one np.add.reduceat.
+    """
+
+    def __init__(self, users: Sequence[str], contribs: Sequence[float], repo_owner: Sequence[int],
+                 columns: Dict[str, Sequence[float]], now: Optional[float] = None):
+        order = np.argsort(np.asarray(repo_owner, dtype=np.int64), kind='stable')
+        owner = np.asarray(repo_owner, dtype=np.int64)[order]
+        self.users = list(users)
+        self.num_repos = np.bincount(owner, minlength=len(self.users))
+        # Candidates without repos can't be scored; reduceat needs non-empty groups
+        self._has_repos = self.num_repos > 0
+        self._starts = np.concatenate(([0], np.cumsum(self.num_repos)[:-1]))[self._has_repos]
+
+        raw = {name: np.asarray(columns[name], dtype=np.float64)[order] for name in columns}
+        now = now or time.time()
+        self.features = np.vstack([
+            raw['llm_score'] / 10.0,
+            raw['analysis_rate'] / 100.0,
+            _log_scale(raw['stars']),
+            _log_scale(raw['size']),
+            np.exp2(-(now - raw['pushed_at']) / 86400.0 / RECENCY_HALF_LIFE),
+            raw['language_share'],
+        ])
+        # Unscored repos contribute nothing to the LLM term and don't count as evidence
+        self.scored = ~np.isnan(self.features[0])
+        self.features = np.nan_to_num(self.features, nan=0.0)
+        self.contribs = _log_scale(np.asarray(contribs, dtype=np.float64))
+        # Partially analyzed repos count proportionally less
+        self.repo_weight = np.where(self.scored, np.clip(np.nan_to_num(raw['analysis_rate'], nan=100.0) / 100.0, 0.1, 1.0), 0.0)
+        if not self.scored.any():
+            # Nothing LLM-scored yet (a fresh crawl): rank on listing features alone
+            self.repo_weight = np.ones_like(self.repo_weight)
+
+    def __len__(self):
+        return len(self.users)
+
+    def _weight_matrix(self, weight_sets: Sequence[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        for weights in weight_sets:
+            unknown = set(weights) - set(DEFAULT_WEIGHTS)
+            if unknown:
+                raise ValueError(f"Unknown weights {sorted(unknown)}; known: {', '.join(DEFAULT_WEIGHTS)}")
+        merged = [dict(DEFAULT_WEIGHTS, **weights) for weights in weight_sets]
+        repo_w = np.array([[w[name] for name in FEATURES] for w in merged])
+        contrib_w = np.array([w['contribs'] for w in merged])
+        return repo_w, contrib_w
+
+    def scores(self, weight_sets: Sequence[Dict[str, float]], prior_strength: float = PRIOR_STRENGTH) -> np.ndarray:
+        """
+        Candidate scores for several weightings at once: an (m, candidates)
+        array, NaN for candidates without scored repos. Weights not given
+        keep their DEFAULT_WEIGHTS value. Each candidate's
+        repo scores are averaged by analysis coverage and shrunk toward the
+        pool mean by prior_strength pseudo-repos.
+        """
+        repo_w, contrib_w = self._weight_matrix(weight_sets)
+        result = np.full((len(weight_sets), len(self.users)), np.nan)
+        if not self._has_repos.any():
+            return result
+        repo_scores = repo_w @ self.features                      # (m, repos)
+        weighted = np.add.reduceat(repo_scores * self.repo_weight, self._starts, axis=1)
+        evidence = np.add.reduceat(self.repo_weight, self._starts)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = weighted / evidence
+        valid = evidence > 0
+        prior = np.nanmean(np.where(valid, means, np.nan), axis=1, keepdims=True) if valid.any() else 0.0
+        shrunk = (weighted + prior_strength * prior) / (evidence + prior_strength)
+        shrunk[:, ~valid] = np.nan
+        result[:, self._has_repos] = shrunk
+        return result + contrib_w[:, None] * self.contribs
+
+    def top_k(self, weights: Optional[Dict[str, float]] = None, k: int = 50,
+              prior_strength: float = PRIOR_STRENGTH) -> List[Tuple[str, float, int]]:
+        """Best k candidates as (user_url, score, repos), highest first."""
+        return self.top_k_many([weights or {}], k, prior_strength)[0]
+
+    def top_k_many(self, weight_sets: Sequence[Dict[str, float]], k: int = 50,
+                   prior_strength: float = PRIOR_STRENGTH) -> List[List[Tuple[str, float, int]]]:
+        scores = np.nan_to_num(self.scores(weight_sets, prior_strength), nan=-np.inf)
+        k = min(k, len(self.users))
+        if k <= 0:
+            return [[] for _ in weight_sets]
+        rankings = []
+        for row in scores:
+            # argpartition finds the top k in O(n); only those k get sorted
+            top = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(-row[top], kind='stable')]
+            rankings.append([
+                (self.users[i], round(float(row[i]), 4), int(self.num_repos[i]))
+                for i in top if np.isfinite(row[i])
+            ])
+        return rankings
+
+def _log_scale(values: np.ndarray) -> np.ndarray:
+    # log1p squashes heavy tails (stars, size, contributions) into [0, 1]
+    logged = np.log1p(np.nan_to_num(np.maximum(values, 0), nan=0.0))
+    top = logged.max() if logged.size else 0.0
+    return logged / top if top > 0 else logged
+
+def _repo_row(repo: Dict[str, Any], score, language: str) -> Tuple[float, ...]:
+    percentages = repo.get('language_percentages')
+    if percentages is not None:
+        share = percentages.get(language, 0.0) / 100.0
+    else:
+        share = 1.0 if repo.get('language') == language else 0.0
+    return (
+        np.nan if score is None else score,
+        repo.get('analysis_rate', 100.0 if score is not None else np.nan),
+        repo.get('stargazers_count', repo.get('stars')) or 0,
+        repo.get('size') or 0,
+        to_timestamp(repo.get('pushed_at')) or 0.0,
+        share,
+    )
+
+def build_pool(candidates: Iterable[Tuple[str, Optional[float], Iterable[Tuple[Dict[str, Any], Optional[float]]]]],
+               language: str = 'Python', now: Optional[float] = None) -> CandidatePool:
+    """Pool from (user_url, contribs, [(repo dict, llm score or None), ...]) triples."""
+    users, contribs, owner, rows = [], [], [], []
+    for i, (user_url, user_contribs, repos) in enumerate(candidates):
+        users.append(user_url)
+        contribs.append(user_contribs or 0)
+        for repo, score in repos:
+            owner.append(i)
+            rows.append(_repo_row(repo, score, language))
+    columns = dict(zip(
+        ('llm_score', 'analysis_rate', 'stars', 'size', 'pushed_at', 'language_share'),
+        np.array(rows, dtype=np.float64).reshape(-1, 6).T
+    ))
+    return CandidatePool(users, contribs, owner, columns, now)
+
+def pool_from_crawl(all_profiles: Dict[str, Tuple[int, Any]], scores: Optional[Dict[str, Dict[str, float]]] = None,
+                    language: str = 'Python') -> CandidatePool:
+    """
+    Pool from do_dfs's {url: (contribs, repos)} and, optionally, per-repo
+    LLM scores as {url: {full_name: score}}; without them llm_score is unset.
+    """
+    scores = scores or {}
+    return build_pool(
+        (
+            (url, contribs, [(repo, scores.get(url, {}).get(repo['full_name'])) for repo in repos or []])
+            for url, (contribs, repos) in all_profiles.items()
+        ),
+        language
+    )
+
+def pool_from_index(index, language: str = 'Python') -> CandidatePool:
+    """Pool from every candidate and repo in a CandidateIndex."""
+    candidates, repos = index.ranking_rows()
+    position = {user_url: i for i, (user_url, _) in enumerate(candidates)}
+    owner = [position[row[0]] for row in repos]
+    columns = {
+        'llm_score': [np.nan if row[4] is None else row[4] for row in repos],
+        'analysis_rate': [np.nan if row[5] is None else row[5] for row in repos],
+        'stars': [row[2] or 0 for row in repos],
+        # The index doesn't keep repo size; the feature is flat
+        'size': [0.0] * len(repos),
+        'pushed_at': [row[3] or 0.0 for row in repos],
+        'language_share': [1.0 if row[1] == language else 0.0 for row in repos],
+    }
+    return CandidatePool([c[0] for c in candidates], [c[1] or 0 for c in candidates], owner, columns)
+
+# Seconds a pool built from the index is reused before re-reading it
+POOL_MAX_AGE = 60
+_index_pools: Dict[Tuple[str, str], Tuple[float, CandidatePool]] = {}
+
+def get_index_pool(index, language: str = 'Python', max_age: float = POOL_MAX_AGE) -> CandidatePool:
+    """pool_from_index, cached so repeated re-ranking only pays for the arithmetic."""
+    key = (index.path, language)
+    built, pool = _index_pools.get(key, (0.0, None))
+    if pool is None or time.time() - built > max_age:
+        pool = pool_from_index(index, language)
+        _index_pools[key] = (time.time(), pool)
+    return pool
+
+def _synthetic_pool(num_candidates: int, seed: int = 0) -> CandidatePool:
+    rng = np.random.default_rng(seed)
+    repos = rng.integers(0, 8, num_candidates)
+    owner = np.repeat(np.arange(num_candidates), repos)
+    n = len(owner)
+    scores = rng.uniform(3, 10, n)
+    scores[rng.random(n) < 0.2] = np.nan
+    columns = {
+        'llm_score': scores,
+        'analysis_rate': np.where(np.isnan(scores), np.nan, rng.uniform(20, 100, n)),
+        'stars': rng.pareto(1.2, n) * 5,
+        'size': rng.pareto(1.0, n) * 100,
+        'pushed_at': time.time() - rng.uniform(0, 5 * 365 * 86400, n),
+        'language_share': rng.random(n),
+    }
+    users = [f"https://github.com/user{i}" for i in range(num_candidates)]
+    return CandidatePool(users, rng.pareto(1.5, num_candidates) * 10, owner, columns)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Time re-ranking a synthetic candidate pool")
+    parser.add_argument('--candidates', type=int, default=100000)
+    parser.add_argument('--weight-sets', type=int, default=16)
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pool = _synthetic_pool(args.candidates)
+    print(f"Built pool: {len(pool)} candidates, {pool.features.shape[1]} repos in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    top = pool.top_k(k=args.k)
+    print(f"Ranked once in {(time.perf_counter() - start) * 1000:.1f} ms; best: {top[0]}")
+
+    rng = np.random.default_rng(1)
+    weight_sets = [dict(zip(DEFAULT_WEIGHTS, w)) for w in rng.dirichlet(np.ones(len(DEFAULT_WEIGHTS)), args.weight_sets)]
+    start = time.perf_counter()
+    pool.top_k_many(weight_sets, k=args.k)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Ranked under {len(weight_sets)} weightings in {elapsed:.1f} ms ({elapsed / len(weight_sets):.1f} ms each)")
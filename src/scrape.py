@@ -1,58 +1,156 @@
-import requests
-from bs4 import BeautifulSoup
+import re
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import GITHUB_WEB_URL
+
+# requests and bs4 are imported on first use so importing this module (and
+# loop/server through it) stays cheap
+PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+PROFILE_WORKERS = 16
+FETCH_TIMEOUT = (5, 15)
+SOCIAL_PREFIXES = {
+    'https://twitter.com/': 'twitter',
+    'https://x.com/': 'twitter',
+    'https://www.linkedin.com/': 'linkedin',
+    'https://twitch.tv/': 'twitch',
+}
+
+_local = threading.local()
+
+def _has_vcard_class(value) -> bool:
+    # The strainer sees the raw attribute string ("vcard-details mb-3"), not a class list
+    return bool(value) and 'vcard-details' in (value.split() if isinstance(value, str) else value)
+
+@lru_cache(maxsize=None)
+def _vcard_strainer():
+    # Only the vcard list is ever built into a tree
+    from bs4 import SoupStrainer
+    return SoupStrainer('ul', class_=_has_vcard_class)
+
+def _session():
+    # Per-thread keep-alive session so bulk fetches reuse connections to github.com
+    if not hasattr(_local, 'session'):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return _local.session
 
 def get_html_content(url):
+    import requests
     try:
-        response = requests.get(url)
+        response = _session().get(url, timeout=FETCH_TIMEOUT)
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
         print(f"Error fetching URL {url}: {e}")
         return None
 
+# Opening tag of the vcard list, and any <ul> open/close inside it
+_VCARD_OPEN = re.compile(r'<ul\b[^>]*\bclass\s*=\s*["\'][^"\']*\bvcard-details\b[^>]*>', re.IGNORECASE)
+_UL_TAG = re.compile(r'<(/?)ul\b[^>]*>', re.IGNORECASE)
+
+def _vcard_fragment(html_content: str) -> Optional[str]:
+    """
+    The vcard <ul> element cut out of the page, nested lists included, so
+    only it gets parsed. None when no such tag is found or it isn't closed;
+    the caller then parses the whole page.
+    """
+    match = _VCARD_OPEN.search(html_content)
+    if not match:
+        return None
+    depth = 1
+    for tag in _UL_TAG.finditer(html_content, match.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html_content[match.start():tag.end()]
+    return None
+
 def scrape_github_profile(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
+    from bs4 import BeautifulSoup
+    fragment = _vcard_fragment(html_content)
+    soup = BeautifulSoup(fragment or html_content, PARSER, parse_only=_vcard_strainer())
     vcard_details = soup.find('ul', class_='vcard-details')
-    
+    if not vcard_details and fragment:
+        # The cut missed (markup changed around it); fall back to the full page
+        soup = BeautifulSoup(html_content, PARSER, parse_only=_vcard_strainer())
+        vcard_details = soup.find('ul', class_='vcard-details')
+
     if not vcard_details:
         return None
-    
+
     info = {}
-    
+
     for li in vcard_details.find_all('li'):
-        if 'octicon-location' in str(li):
+        if li.find(class_='octicon-location'):
             info['location'] = li.text.strip()
-        elif 'octicon-link' in str(li):
+        elif li.find(class_='octicon-link'):
             link = li.find('a')
             info['website'] = link.get('href') if link else ''
-        
+
         # Direct parsing for specific social media links
         link = li.find('a')
         if link:
             href = link.get('href', '')
-            if 'https://twitter.com/' in href:
-                info['twitter'] = href
-            elif 'https://www.linkedin.com/' in href:
-                info['linkedin'] = href
-            elif 'https://twitch.tv/' in href:
-                info['twitch'] = href
-    
+            for prefix, name in SOCIAL_PREFIXES.items():
+                if href.startswith(prefix):
+                    info[name] = href
+                    break
+
     return info
 
-# Example usage
-github_username = "nottlespike"
-url = f"https://github.com/{github_username}"
+def profile_url(username: str) -> str:
+    return f"{GITHUB_WEB_URL}/{username}"
+
+def _enrich_one(url: str) -> Tuple[Optional[Dict[str, str]], float]:
+    username = url.rstrip('/').split('/')[-1]
+    html_content = get_html_content(profile_url(username))
+    if not html_content:
+        return None, 0.0
+    started = time.perf_counter()
+    record = scrape_github_profile(html_content)
+    return record or {}, time.perf_counter() - started
+
+def enrich_profiles(profile_urls: Iterable[str], max_workers: int = PROFILE_WORKERS) -> Dict[str, Dict[str, str]]:
+    """
+    Fetches and parses many GitHub profiles concurrently. Takes profile URLs
+    or bare usernames and returns {input: record}, where record holds
+    whichever of location, website and social links the profile lists.
+    Profiles that failed to load are left out.
+    """
+    urls = list(dict.fromkeys(profile_urls))
+    if not urls:
+        return {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        outcomes = list(executor.map(_enrich_one, urls))
+    elapsed = time.perf_counter() - started
 
-html_content = get_html_content(url)
+    records = {url: record for url, (record, _) in zip(urls, outcomes) if record is not None}
+    parse_times = [seconds for record, seconds in outcomes if record is not None]
+    parse_ms = sum(parse_times) / len(parse_times) * 1000 if parse_times else 0.0
+    print(f"Enriched {len(records)}/{len(urls)} profiles in {elapsed:.2f}s "
+          f"({len(urls) / elapsed:.1f} profiles/s, {parse_ms:.2f} ms parse/page, parser={PARSER})")
+    return records
 
-if html_content:
-    result = scrape_github_profile(html_content)
+if __name__ == "__main__":
+    # Example usage
+    github_username = "nottlespike"
+    result = enrich_profiles([github_username]).get(github_username)
     if result:
         print(f"Scraped information for {github_username}:")
         for key, value in result.items():
             print(f"{key.capitalize()}: {value}")
+    elif result is None:
+        print("Failed to fetch HTML content.")
     else:
         print("No vcard-details found in the provided HTML.")
-else:
-    print("Failed to fetch HTML content.")
\ No newline at end of file
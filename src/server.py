@@ -37,11 +37,11 @@
 
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, List
-import uvicorn
+from typing import Dict, List, Optional
 
 # Import necessary functions
 from loop import calculate_repo_score, fetch_candidates_and_scores
+from candidate_index import get_candidate_index, SORT_COLUMNS
 
 app = FastAPI()
 
@@ -55,11 +55,12 @@ class RepoRequest(BaseModel):
 @app.get("/scores")
 async def get_scores(
     seed_github_link: str = Query(..., description="The seed GitHub link"),
-    num_candidates: int = Query(..., description="Number of candidates")
+    num_candidates: int = Query(..., description="Number of candidates"),
+    enrich: bool = Query(True, description="Attach location, website and socials from each profile page")
 ):
     try:
         # Run BFS scraping to get contributors and their repos
-        scores = fetch_candidates_and_scores(seed_github_link, num_candidates)
+        scores = fetch_candidates_and_scores(seed_github_link, num_candidates, enrich)
 
         return scores
     except Exception as e:
@@ -76,7 +77,68 @@ async def get_repo_info(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Plain def: the SQLite query runs on FastAPI's thread pool, off the event loop
+@app.get("/leaderboard")
+def get_leaderboard(
+    min_score: Optional[float] = Query(None, description="Minimum average repo score"),
+    min_repos: int = Query(1, ge=0, description="Minimum number of scored repos"),
+    language: Optional[str] = Query(None, description="Primary language, e.g. Python"),
+    min_language_share: float = Query(0.0, ge=0.0, le=1.0, description="Minimum share of repos in `language`"),
+    min_stars: Optional[int] = Query(None, description="Minimum total stars"),
+    max_stars: Optional[int] = Query(None, description="Maximum total stars"),
+    pushed_after: Optional[str] = Query(None, description="ISO date of the most recent push"),
+    min_contribs: Optional[int] = Query(None, description="Minimum contributions to the repo they were found through"),
+    sort: str = Query('score', description=f"One of {', '.join(SORT_COLUMNS)}"),
+    descending: bool = Query(True),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    index = get_candidate_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Candidate index is disabled")
+    try:
+        candidates = index.leaderboard(
+            min_score=min_score, min_repos=min_repos, language=language, min_language_share=min_language_share,
+            min_stars=min_stars, max_stars=max_stars, pushed_after=pushed_after, min_contribs=min_contribs,
+            sort=sort, descending=descending, limit=limit, offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"candidates": candidates}
+
+@app.get("/rank")
+def get_rank(
+    weights: Optional[str] = Query(None, description='JSON object of feature weights, e.g. {"llm_score": 0.8, "stars": 0.2}'),
+    language: str = Query('Python', description="Language for the language-share feature"),
+    prior_strength: Optional[float] = Query(None, ge=0.0, description="Pseudo-repos shrinking thin records toward the pool mean"),
+    k: int = Query(50, ge=1, le=1000),
+):
+    import json
+    from ranking import get_index_pool, PRIOR_STRENGTH
+
+    index = get_candidate_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Candidate index is disabled")
+    try:
+        parsed = json.loads(weights) if weights else {}
+        pool = get_index_pool(index, language)
+        strength = PRIOR_STRENGTH if prior_strength is None else prior_strength
+        ranked = pool.top_k(parsed, k, strength)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"candidates": [{"user_url": url, "score": score, "repos": repos} for url, score, repos in ranked]}
+
+@app.get("/candidate")
+def get_candidate(
+    user_url: str = Query(..., description="The candidate's GitHub profile URL")
+):
+    index = get_candidate_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Candidate index is disabled")
+    return {"user_url": user_url, "repos": index.candidate_repos(user_url)}
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
 # ... existing code ...
\ No newline at end of file
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import atexit
+import random
+import inspect
+import itertools
+import threading
+import functools
+import contextvars
+from typing import Any, Callable, Dict, List, Optional
+
+# Spans are only recorded once enable() has been called, or TRACE_FILE is set
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+# Fraction of sampling points (spans opened with sample=True) kept, with their subtrees
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+# Upper bound on buffered events so a long crawl can't grow without limit
+MAX_EVENTS = 500000
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_ids = itertools.count(1)
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_origin = time.perf_counter_ns()
+_pid = os.getpid()
+_enabled = False
+_sample_rate = 1.0
+_dropped = 0
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent', 'tid', 'start', 'args')
+
+    def __init__(self, name, parent, args):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent = parent
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+# Marks a trace that lost the sampling draw; its descendants record nothing
+_UNSAMPLED = object()
+
+class _NullSpan:
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullSpan()
+
+class _SpanContext:
+    __slots__ = ('name', 'args', 'sample', 'span', 'token')
+
+    def __init__(self, name, args, sample):
+        self.name = name
+        self.args = args
+        self.sample = sample
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is _UNSAMPLED:
+            self.span = self.token = None
+            return _NULL
+        if self.sample and _sample_rate < 1.0 and random.random() >= _sample_rate:
+            self.span = None
+            self.token = _current.set(_UNSAMPLED)
+            return _NULL
+        self.span = Span(self.name, parent, self.args)
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            if self.token is not None:
+                _current.reset(self.token)
+            return False
+        end = time.perf_counter_ns()
+        _current.reset(self.token)
+        if exc_type is not None:
+            self.span.args['error'] = exc_type.__name__
+        _record(self.span, end)
+        return False
+
+def _record(span: Span, end: int):
+    global _dropped
+    event = {
+        'name': span.name, 'cat': span.name.split('.')[0], 'ph': 'X',
+        'ts': (span.start - _origin) / 1000, 'dur': (end - span.start) / 1000,
+        'pid': _pid, 'tid': span.tid,
+        'args': dict(span.args, span_id=span.span_id, parent_id=span.parent.span_id if span.parent else None),
+    }
+    events = [event]
+    if span.parent is not None and span.parent.tid != span.tid:
+        # Flow arrow from the parent's thread to the pool thread running the child
+        flow = {'name': 'spawn', 'cat': 'flow', 'id': span.span_id, 'pid': _pid}
+        events.append(dict(flow, ph='s', ts=event['ts'], tid=span.parent.tid))
+        events.append(dict(flow, ph='f', bp='e', ts=event['ts'], tid=span.tid))
+    with _lock:
+        if len(_events) >= MAX_EVENTS:
+            _dropped += 1
+            return
+        _events.extend(events)
+
+def span(name: str, sample: bool = False, **args):
+    """
+    Times a block as a child of the enclosing span:
+
+        with span('github.get_repo', repo=name) as s:
+            ...
+            s.set(files=n)
+
+    Spans marked sample=True (one per unit of repeated work, e.g. a crawl
+    expansion) are kept, whole subtree included, with probability
+    TRACE_SAMPLE_RATE; everything else is always kept. A no-op unless
+    tracing is enabled.
+    """
+    if not _enabled:
+        return _NULL
+    return _SpanContext(name, args, sample)
+
+def traced(name: Optional[str] = None, sample: bool = False):
+    """Decorator form of span(); works on plain and async functions."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*a, **kw):
+                with span(span_name, sample):
+                    return await fn(*a, **kw)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with span(span_name, sample):
+                return fn(*a, **kw)
+        return wrapper
+    return decorator
+
+def bind(fn: Callable) -> Callable:
+    """
+    Wraps fn to run in the caller's context, so spans opened by a thread
+    pool worker nest under the span that submitted the work:
+
+        executor.submit(bind(analyze), ...)
+    """
+    if not _enabled:
+        return fn
+    ctx = contextvars.copy_context()
+    @functools.wraps(fn)
+    def wrapper(*a, **kw):
+        # A context can only be entered by one thread at a time, so each call gets a copy
+        return ctx.copy().run(fn, *a, **kw)
+    return wrapper
+
+def instrument_github():
+    """Records a span for every PyGithub REST request, including lazy pagination."""
+    try:
+        from github.Requester import Requester
+    except ImportError:
+        return
+    if getattr(Requester, '_traced', False):
+        return
+    for method in ('requestJsonAndCheck', 'requestBlobAndCheck'):
+        original = getattr(Requester, method)
+
+        def wrapper(self, verb, url, *a, _original=original, **kw):
+            with span('github.request', verb=verb, url=url.split('?')[0]):
+                return _original(self, verb, url, *a, **kw)
+        setattr(Requester, method, functools.wraps(original)(wrapper))
+    Requester._traced = True
+
+def enable(path: Optional[str] = None, sample_rate: float = TRACE_SAMPLE_RATE):
+    """Starts recording spans; with a path, the trace is written there at exit."""
+    global _enabled, _sample_rate
+    _enabled = True
+    _sample_rate = sample_rate
+    instrument_github()
+    if path:
+        atexit.register(export, path)
+
+def is_enabled() -> bool:
+    return _enabled
+
+def export(path: str) -> int:
+    """Writes buffered spans as Chrome trace JSON (chrome://tracing, ui.perfetto.dev)."""
+    with _lock:
+        events = list(_events)
+        dropped = _dropped
+    metadata = [{'name': 'process_name', 'ph': 'M', 'pid': _pid, 'args': {'name': 'moneyballer'}}]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                   'otherData': {'dropped_spans': dropped, 'sample_rate': _sample_rate}}, f)
+    print(f"Wrote {len(events)} trace events to {path}" + (f" ({dropped} spans dropped)" if dropped else ""))
+    return len(events)
+
+def reset():
+    global _dropped
+    with _lock:
+        _events.clear()
+        _dropped = 0
+
+if TRACE_FILE:
+    enable(TRACE_FILE)
@@ -1,23 +1,39 @@
-import urllib.request
-import json
-import http.client
-import ssl
-import os 
+import os
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from analyzer.code_quality_analyzer import MODEL
+
 load_dotenv()
 
-def fetch_webpage(url):
-    try:
-        with urllib.request.urlopen(url) as response:
-            return response.read().decode('utf-8')
-    except Exception as e:
-        return f"Error fetching webpage: {str(e)}"
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip('/')
+# (connect, read) seconds; the read timeout applies per recv, FETCH_DEADLINE to the whole fetch
+FETCH_TIMEOUT = (5, 10)
+FETCH_DEADLINE = 20
+FETCH_CHUNK_BYTES = 8 * 1024
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+# Visible text sent to the model, ~4k tokens
+MAX_TEXT_CHARS = 16000
+MAX_LINKS = 60
+FETCH_WORKERS = 32
+LLM_WORKERS = 8
+LLM_MAX_RETRIES = 5
+# Rate limited and overloaded; retried with backoff
+RETRY_STATUSES = (429, 529)
+# Markup that never carries readable content
+STRIP_TAGS = ('script', 'style', 'svg', 'noscript', 'template', 'iframe', 'canvas', 'object', 'embed')
+HTML_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
 
-def assess_competency(url):
-    webpage_content = fetch_webpage(url)
-    
-    prompt = f"""You are an expert tech recruiter with deep knowledge of software engineering, web development, and various programming languages and frameworks. You've just been given the HTML content of a personal website. Your task is to thoroughly analyze this content and provide a comprehensive competency assessment of the individual.
+ASSESSMENT_INSTRUCTIONS = """You are an expert tech recruiter with deep knowledge of software engineering, web development, and various programming languages and frameworks. You've just been given the visible text and link structure of a personal website. Your task is to thoroughly analyze this content and provide a comprehensive competency assessment of the individual.
 
 Please consider the following aspects in your analysis:
 1. Technical skills and programming languages evident from the content
@@ -36,47 +52,211 @@ Based on your analysis, provide:
 3. Potential roles or positions this person might be well-suited for
 4. Recommendations for skill improvement or areas to focus on
 
-Here's the webpage content to analyze:
+Please provide your assessment in a clear, structured format."""
 
-{webpage_content}
+Page = namedtuple('Page', ['url', 'final_url', 'title', 'text', 'links', 'error'])
 
-Please provide your assessment in a clear, structured format.
-"""
+_local = threading.local()
+_llm_session = None
+_llm_lock = threading.Lock()
 
-    # Claude API endpoint and headers
-    url = "https://api.anthropic.com/v1/messages"
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": os.getenv("ANTHROPIC_API_KEY"),  # Replace with your actual API key
-        "anthropic-version": "2023-06-01"  # Add this required header
+def _pooled_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-    }
+def _fetch_session() -> requests.Session:
+    # One session per worker thread: cookies and redirects stay per thread,
+    # connections to the same host are still reused across calls
+    if not hasattr(_local, 'session'):
+        _local.session = _pooled_session(4)
+        _local.session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; MoneyBaller/1.0)'
+    return _local.session
+
+def llm_session() -> requests.Session:
+    """Shared keep-alive session for the messages API."""
+    global _llm_session
+    with _llm_lock:
+        if _llm_session is None:
+            _llm_session = _pooled_session(LLM_WORKERS)
+            _llm_session.headers.update({
+                "Content-Type": "application/json",
+                "X-API-Key": os.getenv("ANTHROPIC_API_KEY") or '',
+                "anthropic-version": "2023-06-01",
+            })
+        return _llm_session
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to dedupe pages: lowercase host, no fragment or trailing slash."""
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+def _abort(response: requests.Response):
+    # Shuts the socket down under a recv blocked in another thread; needs
+    # HTTPResponse.shutdown (urllib3 >= 2.3, as pinned). Closing alone
+    # doesn't wake the recv, so the fallback only helps between reads
+    try:
+        response.raw.shutdown()
+    except (AttributeError, ValueError, RuntimeError):
+        response.close()
+
+def fetch_raw(url: str, session: Optional[requests.Session] = None) -> Tuple[str, bytes]:
+    """
+    GETs url with timeouts and a byte cap, following redirects. Returns
+    (final_url, body); bodies over MAX_PAGE_BYTES, or still arriving after
+    FETCH_DEADLINE seconds, are truncated.
+    """
+    session = session or _fetch_session()
+    if '://' not in url:
+        url = 'https://' + url
+    deadline = time.monotonic() + FETCH_DEADLINE
+    with session.get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', 'text/html').split(';')[0].strip().lower()
+        if content_type not in HTML_TYPES:
+            raise ValueError(f"unsupported content type {content_type}")
+        # A server trickling bytes never trips the read timeout, and a read
+        # only returns once a whole chunk arrived; abort it at the deadline
+        timer = threading.Timer(max(0.0, deadline - time.monotonic()), _abort, (response,))
+        timer.start()
+        chunks, size = [], 0
+        try:
+            for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES or time.monotonic() > deadline:
+                    break
+        except Exception:
+            if time.monotonic() < deadline:
+                raise
+            # Cut off at the deadline; keep what arrived
+        finally:
+            timer.cancel()
+        return response.url, b''.join(chunks)[:MAX_PAGE_BYTES]
+
+def extract_page(raw: bytes, base_url: str) -> Tuple[str, str, List[Tuple[str, str]]]:
+    """Title, visible text and (anchor text, absolute href) links of an HTML page."""
+    soup = BeautifulSoup(raw, 'html.parser')
+    for tag in soup(STRIP_TAGS):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ''
 
-    # Request body
+    links, seen = [], set()
+    for a in soup.find_all('a', href=True):
+        href = a['href'].strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+        href = urljoin(base_url, href)
+        if href in seen:
+            continue
+        seen.add(href)
+        links.append((a.get_text(' ', strip=True)[:80], href))
+        if len(links) >= MAX_LINKS:
+            break
+
+    lines = (line.strip() for line in soup.get_text('\n').splitlines())
+    text = '\n'.join(line for line in lines if line)
+    return title, text[:MAX_TEXT_CHARS], links
+
+def fetch_page(url: str) -> Page:
+    try:
+        final_url, raw = fetch_raw(url)
+        title, text, links = extract_page(raw, final_url)
+        return Page(url, final_url, title, text, links, None)
+    except Exception as e:
+        return Page(url, None, '', '', [], f"Error fetching webpage: {str(e)}")
+
+def page_prompt(page: Page) -> str:
+    links = '\n'.join(f"- {text or '(no text)'}: {href}" for text, href in page.links)
+    return (
+        f"Here's the webpage content to analyze:\n\n"
+        f"URL: {page.final_url}\nTitle: {page.title}\n\n"
+        f"Visible text:\n{page.text}\n\n"
+        f"Links:\n{links or '(none)'}"
+    )
+
+def request_assessment(page: Page, usage: Optional[Dict[str, int]] = None) -> str:
     data = {
-        "model": "claude-3-sonnet-20240229",
+        "model": MODEL,
         "max_tokens": 4096,
-        "messages": [{"role": "user", "content": prompt}]
+        "system": ASSESSMENT_INSTRUCTIONS,
+        "messages": [{"role": "user", "content": page_prompt(page)}],
     }
+    for attempt in range(LLM_MAX_RETRIES):
+        response = llm_session().post(f"{ANTHROPIC_BASE_URL}/v1/messages", json=data, timeout=(10, 300))
+        if response.status_code not in RETRY_STATUSES or attempt == LLM_MAX_RETRIES - 1:
+            break
+        # Honour the provider's retry-after, else exponential backoff
+        try:
+            wait_time = float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            wait_time = 2 ** attempt
+        print(f"Rate limit hit. Waiting for {wait_time} seconds before retrying...")
+        time.sleep(wait_time)
+    response.raise_for_status()
+    result = response.json()
+    if usage is not None:
+        with _llm_lock:
+            usage['requests'] = usage.get('requests', 0) + 1
+            for field in ('input_tokens', 'output_tokens'):
+                usage[field] = usage.get(field, 0) + result.get('usage', {}).get(field, 0)
+    return result['content'][0]['text']
 
-    # Create a secure SSL context
-    context = ssl.create_default_context()
+def assess_competency(url):
+    page = fetch_page(url)
+    if page.error:
+        return page.error
+    return request_assessment(page)
 
-    # Make the API request
-    conn = http.client.HTTPSConnection("api.anthropic.com", context=context)
-    conn.request("POST", "/v1/messages", body=json.dumps(data), headers=headers)
+def assess_many(urls: Iterable[str], fetch_workers: int = FETCH_WORKERS,
+                llm_workers: int = LLM_WORKERS) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Assesses many personal sites at once. Pages are fetched concurrently,
+    collapsed to one assessment per final URL after redirects, and scored
+    over a shared pooled LLM session. Returns, per input URL, a dict with
+    'final_url', 'assessment' and 'error'.
+    """
+    urls = list(dict.fromkeys(urls))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(fetch_workers, len(urls)))) as executor:
+        pages = list(executor.map(fetch_page, urls))
+    fetched = time.perf_counter()
 
-    response = conn.getresponse()
-    result = json.loads(response.read().decode())
+    unique = {}
+    for page in pages:
+        if not page.error and page.text:
+            unique.setdefault(normalize_url(page.final_url), page)
 
-    conn.close()
-    print(result)
+    usage = {}
+    def assess(page):
+        try:
+            return request_assessment(page, usage), None
+        except Exception as e:
+            return None, f"Error assessing webpage: {str(e)}"
 
-    # Extract and return the assistant's message
-    return result['content'][0]['text']
+    with ThreadPoolExecutor(max_workers=max(1, min(llm_workers, len(unique)))) as executor:
+        assessments = dict(zip(unique, executor.map(assess, unique.values())))
+
+    results = {}
+    for page in pages:
+        if page.error:
+            results[page.url] = {'final_url': None, 'assessment': None, 'error': page.error}
+        elif not page.text:
+            results[page.url] = {'final_url': page.final_url, 'assessment': None, 'error': "No visible text"}
+        else:
+            assessment, error = assessments[normalize_url(page.final_url)]
+            results[page.url] = {'final_url': page.final_url, 'assessment': assessment, 'error': error}
+
+    elapsed = time.perf_counter() - started
+    print(f"Assessed {len(urls)} sites ({len(unique)} unique pages) in {elapsed:.1f}s "
+          f"(fetch {fetched - started:.1f}s), usage: {usage}")
+    return results
 
 # Example usage
 if __name__ == "__main__":
     url = "https://minjunes.ai"  # Replace with the actual URL you want to analyze
     assessment = assess_competency(url)
-    print(assessment)
\ No newline at end of file
+    print(assessment)
@@ -0,0 +1,240 @@
+import abc
+import json
+import time
+import sqlite3
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Claimed profiles go back to the queue if not completed within this many seconds
+DEFAULT_LEASE_SECONDS = 300
+# A profile whose lease expired this many times is marked failed instead of retried
+MAX_ATTEMPTS = 3
+# Repo fields kept in results; enough for scoring and for walking contributors
+REPO_FIELDS = (
+    'name', 'full_name', 'html_url', 'contributors_url', 'language',
+    'stargazers_count', 'forks_count', 'fork', 'size', 'pushed_at',
+)
+
+Task = namedtuple('Task', ['url', 'contribs', 'depth'])
+
+def slim_repo(repo: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: repo.get(field) for field in REPO_FIELDS}
+
+class WorkQueue(abc.ABC):
+    """
+    Crawl frontier shared by any number of workers. Every profile ever added
+    is remembered, so the table doubles as the shared visited set; workers
+    claim pending profiles under a lease and complete them with their repos.
+    Subclasses implement storage; see SQLiteWorkQueue.
+    """
+
+    @abc.abstractmethod
+    def seed(self, url: str, max_profiles: int):
+        """
+        Starts a crawl from url, capped at max_profiles profiles in total.
+        An unfinished crawl from the same seed is resumed; anything else
+        stored in the queue is discarded.
+        """
+
+    @abc.abstractmethod
+    def add(self, items: Iterable[Tuple[str, int]], depth: int) -> int:
+        """Adds unvisited (url, contribs) profiles while under the cap; returns how many were new."""
+
+    @abc.abstractmethod
+    def is_full(self) -> bool:
+        """True once the crawl holds max_profiles profiles besides the seed."""
+
+    @abc.abstractmethod
+    def claim(self, worker: str, limit: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Task]:
+        """Leases up to limit pending profiles, reclaiming expired leases first."""
+
+    @abc.abstractmethod
+    def complete(self, worker: str, url: str, contribs: int, repos: Optional[List[Dict[str, Any]]]) -> bool:
+        """
+        Records a leased profile's repos. Returns False, recording nothing,
+        when worker no longer holds the lease (it lapsed and was reclaimed).
+        """
+
+    @abc.abstractmethod
+    def is_drained(self) -> bool:
+        """True once nothing is pending or leased."""
+
+    @abc.abstractmethod
+    def results(self) -> Dict[str, Tuple[int, List[Dict[str, Any]]]]:
+        """Completed profiles in do_dfs's shape: {url: (contribs, repos)}."""
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Frontier states, profiles done per worker and throughput."""
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue in one SQLite file. Safe for many processes on one host (WAL,
+    claims in BEGIN IMMEDIATE transactions); across hosts the file must sit
+    on storage with working locks, otherwise use a networked backend.
+    """
+
+    def __init__(self, path: str = 'crawl_queue.sqlite', max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                contribs INTEGER NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, lease_expires);
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                contribs INTEGER NOT NULL,
+                repos TEXT,
+                worker TEXT NOT NULL,
+                finished REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        ''')
+
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front so concurrent claims can't interleave
+        self._conn.execute('BEGIN IMMEDIATE')
+        return self._conn
+
+    def seed(self, url: str, max_profiles: int):
+        conn = self._transaction()
+        try:
+            previous = conn.execute("SELECT value FROM meta WHERE key = 'seed'").fetchone()
+            unfinished = conn.execute("SELECT 1 FROM frontier WHERE state IN ('pending', 'leased') LIMIT 1").fetchone()
+            if previous is None or previous[0] != url or not unfinished:
+                # A new crawl: forget the last one's frontier, visited set and
+                # results. Re-seeding an unfinished crawl resumes it instead
+                conn.execute('DELETE FROM frontier')
+                conn.execute('DELETE FROM results')
+                conn.execute('DELETE FROM meta')
+                conn.execute("INSERT INTO meta VALUES ('seed', ?)", (url,))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('max_profiles', ?)", (str(max_profiles),))
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('started', ?)", (str(time.time()),))
+            conn.execute('INSERT OR IGNORE INTO frontier (url, contribs, depth) VALUES (?, 0, 0)', (url,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _room(self, conn) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'max_profiles'").fetchone()
+        if row is None:
+            return 0
+        # The seed profile doesn't count towards the cap, as in do_dfs
+        return int(row[0]) - (conn.execute('SELECT COUNT(*) FROM frontier').fetchone()[0] - 1)
+
+    def is_full(self) -> bool:
+        return self._room(self._conn) <= 0
+
+    def add(self, items: Iterable[Tuple[str, int]], depth: int) -> int:
+        items = list(items)
+        if not items:
+            return 0
+        conn = self._transaction()
+        try:
+            room = self._room(conn)
+            added = 0
+            for url, contribs in items:
+                if added >= room:
+                    break
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO frontier (url, contribs, depth) VALUES (?, ?, ?)', (url, contribs, depth)
+                )
+                added += cursor.rowcount
+            conn.execute('COMMIT')
+            return added
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, worker: str, limit: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Task]:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            # Leases of crashed or stalled workers lapse back into the queue
+            conn.execute(
+                "UPDATE frontier SET state = 'failed', worker = NULL "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE frontier SET state = 'pending', worker = NULL WHERE state = 'leased' AND lease_expires < ?",
+                (now,)
+            )
+            rows = conn.execute(
+                "SELECT url, contribs, depth FROM frontier WHERE state = 'pending' ORDER BY depth, rowid LIMIT ?",
+                (limit,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE frontier SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE url = ?",
+                [(worker, now + lease_seconds, url) for url, _, _ in rows]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return [Task(*row) for row in rows]
+
+    def complete(self, worker: str, url: str, contribs: int, repos: Optional[List[Dict[str, Any]]]) -> bool:
+        encoded = json.dumps([slim_repo(repo) for repo in repos]) if repos is not None else None
+        conn = self._transaction()
+        try:
+            cursor = conn.execute(
+                "UPDATE frontier SET state = 'done', lease_expires = NULL "
+                "WHERE url = ? AND worker = ? AND state = 'leased'", (url, worker)
+            )
+            owned = cursor.rowcount > 0
+            if owned:
+                conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', (url, contribs, encoded, worker, time.time()))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return owned
+
+    def is_drained(self) -> bool:
+        row = self._conn.execute("SELECT COUNT(*) FROM frontier WHERE state IN ('pending', 'leased')").fetchone()
+        return row[0] == 0
+
+    def results(self) -> Dict[str, Tuple[int, List[Dict[str, Any]]]]:
+        rows = self._conn.execute('SELECT url, contribs, repos FROM results ORDER BY finished').fetchall()
+        return {url: (contribs, json.loads(repos) if repos is not None else None) for url, contribs, repos in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        states = dict(self._conn.execute('SELECT state, COUNT(*) FROM frontier GROUP BY state').fetchall())
+        workers = dict(self._conn.execute('SELECT worker, COUNT(*) FROM results GROUP BY worker').fetchall())
+        started = self._conn.execute("SELECT value FROM meta WHERE key = 'started'").fetchone()
+        last = self._conn.execute('SELECT MAX(finished) FROM results').fetchone()[0]
+        elapsed = (last - float(started[0])) if started and last else 0.0
+        done = sum(workers.values())
+        return {
+            'states': states,
+            'done_by_worker': workers,
+            'elapsed': round(elapsed, 3),
+            'profiles_per_second': round(done / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def close(self):
+        self._conn.close()
+
+# Backends by URL scheme, e.g. 'sqlite:///crawl_queue.sqlite'; register others here
+BACKENDS = {
+    'sqlite': lambda location: SQLiteWorkQueue(location or 'crawl_queue.sqlite'),
+}
+
+def open_work_queue(url: str) -> WorkQueue:
+    scheme, _, location = url.partition('://')
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown work queue backend {scheme!r}; known: {', '.join(BACKENDS)}")
+    # sqlite:///relative.db and sqlite:////abs/path.db, as in SQLAlchemy URLs
+    return BACKENDS[scheme](location[1:] if location.startswith('/') else location)